@@ -0,0 +1,66 @@
+"""Benchmarks the activation memory of training an LTC with and without `memory_efficient_backward`.
+
+Usage (from the repository root):
+
+    python -m benchmarks.ltc_memory
+
+The activation memory is measured as the total size of all tensors autograd
+keeps alive for the backward pass of one (1, BATCH_SIZE, features) sequence,
+i.e. the memory that is at its peak right before `loss.backward()` is called.
+"""
+import time
+
+import torch
+
+from ncps.torch import LTC
+from ncps.wirings import AutoNCP
+from config import Config
+
+IN_FEATURES = 3 + len(Config.FEATURES_LIST)
+NUM_UNITS = [8, 16, 32, 64, 128]
+
+
+def saved_activation_bytes(model, x):
+    storages = {}
+
+    def pack(tensor):
+        storage = tensor.untyped_storage()
+        storages[storage.data_ptr()] = storage.nbytes()
+        return tensor
+
+    with torch.autograd.graph.saved_tensors_hooks(pack, lambda tensor: tensor):
+        output, _ = model(x)
+    # Parameters are alive regardless of the backward mode
+    for p in model.parameters():
+        storages.pop(p.untyped_storage().data_ptr(), None)
+    start = time.perf_counter()
+    output.sum().backward()
+    return sum(storages.values()), time.perf_counter() - start
+
+
+def main():
+    x = torch.randn(1, Config.BATCH_SIZE, IN_FEATURES)
+    print(
+        f"{'units':>6} {'default [MiB]':>14} {'efficient [MiB]':>16} {'reduction':>10}"
+        f" {'default bwd [ms]':>17} {'efficient bwd [ms]':>19}"
+    )
+    for units in NUM_UNITS:
+        results = []
+        for memory_efficient_backward in [False, True]:
+            torch.manual_seed(0)
+            model = LTC(
+                IN_FEATURES,
+                AutoNCP(units, 1),
+                batch_first=True,
+                memory_efficient_backward=memory_efficient_backward,
+            )
+            results.append(saved_activation_bytes(model, x))
+        (default, default_time), (efficient, efficient_time) = results
+        print(
+            f"{units:>6} {default / 2**20:>14.2f} {efficient / 2**20:>16.2f} {default / efficient:>9.1f}x"
+            f" {default_time * 1e3:>17.1f} {efficient_time * 1e3:>19.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
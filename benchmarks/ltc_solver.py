@@ -0,0 +1,51 @@
+"""Benchmarks the ODE solver of the LTC cell for the AutoNCP configurations in `Config.NUM_LNN_UNITS`.
+
+Usage (from the repository root):
+
+    python -m benchmarks.ltc_solver
+
+Each measurement is one forward and backward pass over a (1, BATCH_SIZE, features)
+sequence, i.e. the shape `SequenceLearner.training_step` feeds into the model.
+"""
+import time
+
+import torch
+
+from ncps.torch import LTC
+from ncps.wirings import AutoNCP
+from config import Config
+
+IN_FEATURES = 3 + len(Config.FEATURES_LIST)
+WARMUP = 3
+REPEATS = 10
+
+
+def time_train_step(model, x):
+    for _ in range(WARMUP):
+        model(x)[0].sum().backward()
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        model(x)[0].sum().backward()
+    return (time.perf_counter() - start) / REPEATS
+
+
+def main():
+    x = torch.randn(1, Config.BATCH_SIZE, IN_FEATURES)
+    print(f"{'units':>6} {'eager [ms]':>12} {'fused [ms]':>12} {'speedup':>8}")
+    for units in Config.NUM_LNN_UNITS:
+        timings = []
+        for fused_solver in [False, True]:
+            torch.manual_seed(0)
+            model = LTC(
+                IN_FEATURES,
+                AutoNCP(units, 1),
+                batch_first=True,
+                fused_solver=fused_solver,
+            )
+            timings.append(time_train_step(model, x))
+        eager, fused = timings
+        print(f"{units:>6} {eager * 1e3:>12.1f} {fused * 1e3:>12.1f} {eager / fused:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
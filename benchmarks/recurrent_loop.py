@@ -0,0 +1,65 @@
+"""Benchmarks the recurrent loop of LTC and CfC in eager mode and compiled with `torch.compile`.
+
+Usage (from the repository root):
+
+    python -m benchmarks.recurrent_loop
+
+Each measurement is one forward and backward pass over a (1, BATCH_SIZE, features)
+sequence, i.e. the shape `SequenceLearner.training_step` feeds into the model.
+The models are compiled with `fullgraph=True`, i.e. the whole loop over the
+time-steps is captured in one graph. Compilation happens during the warmup and
+is reported separately; as the loop is unrolled it can take several minutes
+per model on CPU.
+"""
+import time
+
+import torch
+
+from ncps.torch import CfC, LTC
+from ncps.wirings import AutoNCP
+from config import Config
+
+IN_FEATURES = 3 + len(Config.FEATURES_LIST)
+WARMUP = 3
+REPEATS = 10
+MODELS = {
+    "LTC": lambda units: LTC(IN_FEATURES, AutoNCP(units, 1), batch_first=True),
+    "CfC": lambda units: CfC(IN_FEATURES, units, batch_first=True),
+    "wired CfC": lambda units: CfC(IN_FEATURES, AutoNCP(units, 1), batch_first=True),
+}
+
+
+def time_train_step(model, x):
+    start = time.perf_counter()
+    for _ in range(WARMUP):
+        model(x)[0].sum().backward()
+    warmup = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        model(x)[0].sum().backward()
+    return (time.perf_counter() - start) / REPEATS, warmup
+
+
+def main():
+    x = torch.randn(1, Config.BATCH_SIZE, IN_FEATURES)
+    print(
+        f"{'model':>10} {'units':>6} {'eager [ms]':>12} {'compiled [ms]':>14}"
+        f" {'speedup':>8} {'compile [s]':>12}"
+    )
+    for name, make_model in MODELS.items():
+        for units in Config.NUM_LNN_UNITS:
+            torch.manual_seed(0)
+            model = make_model(units)
+            eager, _ = time_train_step(model, x)
+            torch._dynamo.reset()
+            compiled, compile_time = time_train_step(
+                torch.compile(model, fullgraph=True), x
+            )
+            print(
+                f"{name:>10} {units:>6} {eager * 1e3:>12.1f} {compiled * 1e3:>14.1f}"
+                f" {eager / compiled:>7.2f}x {compile_time:>12.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
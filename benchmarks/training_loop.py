@@ -0,0 +1,87 @@
+"""Benchmarks the training throughput of the Lightning Trainer and `project.trainer.FastTrainer`.
+
+Usage (from the repository root):
+
+    python -m benchmarks.training_loop
+
+Both train the default model of `run.train` (the first entries of the
+hyperparameter lists in `Config`) on random data of NUM_BATCHES batches of
+BATCH_SIZE hours, with a checkpoint and a CSV log as in `run.fit`.
+"""
+import tempfile
+import time
+
+import torch
+import torch.utils.data as data_utils
+import pytorch_lightning as pl
+
+from ncps.torch import LTC
+from ncps.wirings import AutoNCP
+from config import Config
+from project.model import SequenceLearner
+from project.trainer import FastTrainer
+
+IN_FEATURES = 3 + len(Config.FEATURES_LIST)
+NUM_BATCHES = 50
+EPOCHS = 2
+
+
+def make_learner():
+    torch.manual_seed(0)
+    model = LTC(
+        IN_FEATURES,
+        AutoNCP(Config.NUM_LNN_UNITS[0], 1),
+        batch_first=True,
+        use_swish_activation=Config.USE_SWISH_ACTIVATION[0],
+    )
+    return SequenceLearner(model, lr=Config.INIT_LR[0], features_num=IN_FEATURES, device="cpu")
+
+
+def lightning_fit(learner, dataloader, tmpdir):
+    checkpoint_callback = pl.callbacks.ModelCheckpoint(
+        monitor="train_loss_epoch", dirpath=tmpdir, filename="lightning", save_top_k=1, mode="min"
+    )
+    trainer = pl.Trainer(
+        max_epochs=EPOCHS,
+        callbacks=[checkpoint_callback],
+        logger=pl.loggers.CSVLogger(tmpdir),
+        log_every_n_steps=Config.LOG_EVERY_N_STEPS,
+        gradient_clip_val=1,
+        enable_progress_bar=False,
+        enable_model_summary=False,
+    )
+    trainer.fit(learner, dataloader)
+
+
+def fast_fit(learner, dataloader, tmpdir):
+    trainer = FastTrainer(
+        max_epochs=EPOCHS,
+        gradient_clip_val=1,
+        log_every_n_steps=Config.LOG_EVERY_N_STEPS,
+        dirpath=tmpdir,
+        filename="fast",
+        log_dir=tmpdir,
+    )
+    trainer.fit(learner, dataloader)
+
+
+def main():
+    num_rows = NUM_BATCHES * Config.BATCH_SIZE
+    # MAPE needs targets away from zero, like the scaled loads
+    ds = data_utils.TensorDataset(
+        torch.rand(num_rows, IN_FEATURES), 0.5 + torch.rand(num_rows, 1)
+    )
+    dataloader = data_utils.DataLoader(ds, batch_size=Config.BATCH_SIZE, shuffle=False)
+    steps = EPOCHS * NUM_BATCHES
+    print(f"{'trainer':>10} {'time [s]':>9} {'steps/s':>8}")
+    with tempfile.TemporaryDirectory() as tmpdir:
+        for name, fit in [("lightning", lightning_fit), ("fast", fast_fit)]:
+            learner = make_learner()
+            start = time.perf_counter()
+            fit(learner, dataloader, tmpdir)
+            elapsed = time.perf_counter() - start
+            print(f"{name:>10} {elapsed:>9.2f} {steps / elapsed:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
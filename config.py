@@ -34,13 +34,38 @@ class Config:
     VALUES_PER_DAY: int = 24
     FILTER_DT_FROM: str = "2014-01-01 00:00:00"
     FILTER_DT_TILL: str = "2017-01-01 00:00:00"
+    # compute the features of FEATURES_LIST that project.utils.computed_features names from the series,
+    # instead of reading them from PATH (the output of the R analysis)
+    COMPUTE_FEATURES: bool = False
+    # preprocessed training arrays are kept in FEATURE_STORE_PATH and reused while the
+    # source file and the settings above do not change
+    USE_FEATURE_STORE: bool = True
+    FEATURE_STORE_PATH: str = "data/features/"
+    # preprocess the source in chunks of CHUNK_SIZE rows, written to the feature store one by one,
+    # such that the memory needed does not depend on the size of the source (which has to be sorted by Datetime)
+    STREAMING_INGESTION: bool = False
+    CHUNK_SIZE: int = 2 ** 16
 
 
     # global settings
     TRAIN: bool = True
     EVALUATE: bool = False
     GRID_SEARCH: bool = False
+    # number of processes training grid search combinations in parallel, the cores are split between them
+    # (GRID_SEARCH_WORKERS > 1, ENSEMBLE_TRAINING and SUCCESSIVE_HALVING are alternatives, set at most one)
+    GRID_SEARCH_WORKERS: int = 1
     CHECKPOINTS_PATH = "pl_checkpoints/"
+    # SQLite database of the trained grid search combinations, already trained ones are skipped
+    RESULTS_DB: str = "pl_checkpoints/results.sqlite"
+    # train with project.trainer.FastTrainer instead of the Lightning Trainer (no truncated BPTT)
+    FAST_TRAINING: bool = False
+    # grid search: train all INIT_LR x NUM_EPOCHS combinations of a model size at once (project.trainer.EnsembleTrainer)
+    ENSEMBLE_TRAINING: bool = False
+    # grid search: treat NUM_EPOCHS as budgets of a successive halving, only the best 1/HALVING_ETA
+    # of the combinations continue training (from their checkpoint) up to the next budget
+    SUCCESSIVE_HALVING: bool = False
+    HALVING_ETA: int = 3
+    LOG_EVERY_N_STEPS: int = 50
 
 
     # torch Dataloader related
@@ -48,7 +73,23 @@ class Config:
     NUM_WORKERS: int = 1
 
 
+    # windowed training: batches of WINDOW_BATCH_SIZE overlapping windows of WINDOW_SIZE hours
+    # instead of one sequence of BATCH_SIZE hours, the loss skips the first BURN_IN_STEPS of each window
+    WINDOWED_TRAINING: bool = False
+    WINDOW_SIZE: int = 7 * 24
+    WINDOW_STRIDE: int = 24
+    WINDOW_BATCH_SIZE: int = 32
+    BURN_IN_STEPS: int = 24
+
+
+    # stateful training: the hidden state is carried over from one batch to the next one (not with windowed training),
+    # with TBPTT_STEPS set every batch is split into chunks of TBPTT_STEPS hours with one optimizer step each
+    STATEFUL_TRAINING: bool = False
+    TBPTT_STEPS: int = None
+
+
     # hyperparameters of LNN
+    WIRING_SEED: int = 22222
     NUM_LNN_UNITS: list = [8, 16, 32]
     USE_SWISH_ACTIVATION: list = [False, True]
     INIT_LR: list = [0.01, 0.0001]
@@ -158,6 +158,279 @@ def test_ncp_cfc_2():
     assert output.size() == (5, 3, 8)
     assert hx.size() == (3, 10 + 10 + 8)
 
+def test_ltc_sparse_synapses():
+    input_size = 8
+    wiring = ncps.wirings.AutoNCP(16, 4)
+    dense = LTC(input_size, ncps.wirings.AutoNCP(16, 4), batch_first=True)
+    sparse = LTC(input_size, wiring, batch_first=True, sparse_synapses=True)
+    assert sparse.rnn_cell.w.numel() == wiring.synapse_count
+    # Dense checkpoints are converted to the synapse list at load time
+    sparse.load_state_dict(dense.state_dict())
+    input = torch.randn(5, 3, input_size)
+    output, hx = sparse(input)
+    dense_output, dense_hx = dense(input)
+    assert output.size() == (5, 3, 4)
+    assert torch.allclose(output, dense_output, atol=1e-5)
+    assert torch.allclose(hx, dense_hx, atol=1e-5)
+
+
+def test_ltc_sparse_synapses_swish():
+    input_size = 8
+    wiring = ncps.wirings.NCP(10, 10, 8, 6, 6, 4, 6)
+    dense = LTCCell(
+        ncps.wirings.NCP(10, 10, 8, 6, 6, 4, 6), input_size, use_swish_activation=True
+    )
+    sparse = LTCCell(wiring, input_size, use_swish_activation=True, sparse_synapses=True)
+    sparse.load_state_dict(dense.state_dict())
+    input = torch.randn(3, input_size)
+    hx = torch.randn(3, wiring.units)
+    output, next_hx = sparse(input, hx)
+    dense_output, dense_next_hx = dense(input, hx)
+    assert torch.allclose(output, dense_output, atol=1e-5)
+    assert torch.allclose(next_hx, dense_next_hx, atol=1e-5)
+    output.sum().backward()
+    assert sparse.w.grad.size() == sparse.w.size()
+
+
+def test_ltc_fused_solver():
+    input_size = 8
+    eager = LTC(input_size, ncps.wirings.AutoNCP(16, 4), batch_first=True)
+    fused = LTC(input_size, ncps.wirings.AutoNCP(16, 4), batch_first=True, fused_solver=True)
+    fused.load_state_dict(eager.state_dict())
+    input = torch.randn(5, 3, input_size)
+    output, hx = fused(input)
+    eager_output, eager_hx = eager(input)
+    assert torch.allclose(output, eager_output, atol=1e-5)
+    output.sum().backward()
+    eager_output.sum().backward()
+    assert torch.allclose(fused.rnn_cell.w.grad, eager.rnn_cell.w.grad, atol=1e-5)
+
+
+def test_ltc_adaptive_unfolds():
+    input_size = 8
+    rnn = LTC(input_size, ncps.wirings.AutoNCP(16, 4), batch_first=True)
+    adaptive = LTC(
+        input_size, ncps.wirings.AutoNCP(16, 4), batch_first=True, ode_tolerance=1e-3
+    )
+    adaptive.load_state_dict(rnn.state_dict())
+    input = torch.randn(5, 3, input_size)
+
+    # Training mode always spends the fixed number of unfolds
+    output, hx = adaptive(input)
+    assert adaptive.rnn_cell.mean_ode_unfolds == 6
+    assert torch.allclose(output, rnn(input)[0])
+
+    adaptive.eval()
+    adaptive.rnn_cell.reset_ode_stats()
+    with torch.no_grad():
+        output, hx = adaptive(input)
+    assert output.size() == (5, 3, 4)
+    assert adaptive.rnn_cell.ode_steps == 3
+    assert 1 <= adaptive.rnn_cell.mean_ode_unfolds <= 6
+
+
+def test_ltc_memory_efficient_backward():
+    input_size = 8
+    rnn = LTC(input_size, ncps.wirings.AutoNCP(16, 4), batch_first=True)
+    efficient = LTC(
+        input_size,
+        ncps.wirings.AutoNCP(16, 4),
+        batch_first=True,
+        memory_efficient_backward=True,
+    )
+    efficient.load_state_dict(rnn.state_dict())
+    input = torch.randn(5, 3, input_size)
+    output, hx = efficient(input)
+    rnn_output, rnn_hx = rnn(input)
+    assert torch.allclose(output, rnn_output)
+    output.pow(2).sum().backward()
+    rnn_output.pow(2).sum().backward()
+    for p, q in zip(efficient.parameters(), rnn.parameters()):
+        if p.requires_grad:
+            assert torch.allclose(p.grad, q.grad, atol=1e-5)
+
+
+def _gradients(rnn, input, seed=0):
+    torch.manual_seed(seed)
+    output, hx = rnn(input)
+    rnn.zero_grad()
+    output.pow(2).sum().backward()
+    return output, [p.grad.clone() for p in rnn.parameters() if p.requires_grad]
+
+
+def test_ltc_checkpoint_every():
+    input_size = 8
+    rnn = LTC(input_size, ncps.wirings.AutoNCP(16, 4), batch_first=True)
+    input = torch.randn(5, 7, input_size)
+    output, grads = _gradients(rnn, input)
+    rnn.checkpoint_every = 3
+    rnn.rnn_cell.reset_ode_stats()
+    checkpointed_output, checkpointed_grads = _gradients(rnn, input)
+    assert torch.equal(output, checkpointed_output)
+    for g, checkpointed_g in zip(grads, checkpointed_grads):
+        assert torch.equal(g, checkpointed_g)
+    # the time-steps recomputed in the backward pass are not counted again
+    assert rnn.rnn_cell.ode_steps == 7
+    assert rnn.rnn_cell.ode_unfolds_spent == 7 * 6
+
+
+def test_cfc_checkpoint_every():
+    input_size = 8
+    rnn = CfC(
+        input_size,
+        32,
+        batch_first=False,
+        mixed_memory=True,
+        backbone_layers=2,
+        backbone_dropout=0.1,
+        checkpoint_every=2,
+    )
+    input = torch.randn(7, 5, input_size)
+    checkpointed_output, checkpointed_grads = _gradients(rnn, input)
+    assert checkpointed_output.size() == (7, 5, 32)
+    rnn.checkpoint_every = None
+    output, grads = _gradients(rnn, input)
+    assert torch.equal(output, checkpointed_output)
+    for g, checkpointed_g in zip(grads, checkpointed_grads):
+        assert torch.equal(g, checkpointed_g)
+
+
+def test_ltc_matches_cell_steps():
+    input_size = 8
+    for sparse_synapses in [False, True]:
+        rnn = LTC(
+            input_size,
+            ncps.wirings.AutoNCP(16, 4),
+            batch_first=True,
+            sparse_synapses=sparse_synapses,
+        )
+        input = torch.randn(5, 3, input_size)
+        output, hx = rnn(input)
+        h = torch.zeros(5, 16)
+        for t in range(3):
+            out, h = rnn.rnn_cell(input[:, t], h)
+            assert torch.allclose(output[:, t], out, atol=1e-6)
+        assert torch.allclose(hx, h, atol=1e-6)
+
+
+def test_cfc_matches_cell_steps():
+    input_size = 8
+    for units, mode, mixed_memory in [
+        (32, "default", False),
+        (32, "pure", True),
+        (32, "no_gate", False),
+        (ncps.wirings.NCP(10, 10, 8, 6, 6, 4, 6), "default", True),
+    ]:
+        rnn = CfC(input_size, units, mode=mode, mixed_memory=mixed_memory)
+        input = torch.randn(5, 3, input_size)
+        output, hx = rnn(input)
+        h = torch.zeros(5, rnn.state_size)
+        c = torch.zeros(5, rnn.state_size)
+        for t in range(3):
+            if mixed_memory:
+                h, c = rnn.lstm(input[:, t], (h, c))
+            out, h = rnn.rnn_cell(input[:, t], h, 1.0)
+            assert torch.allclose(output[:, t], out, atol=1e-5)
+        assert torch.allclose(hx[0] if mixed_memory else hx, h, atol=1e-5)
+
+
+def test_timespans_per_sample():
+    input_size = 8
+    input = torch.randn(5, 3, input_size)
+    timespans = torch.rand(5, 3)
+    for rnn in [
+        LTC(input_size, ncps.wirings.AutoNCP(10, 2), return_sequences=False),
+        CfC(input_size, 16, return_sequences=False),
+    ]:
+        output, hx = rnn(input, timespans=timespans)
+        for i in range(5):
+            sample_output, sample_hx = rnn(input[i], timespans=timespans[i])
+            assert torch.allclose(output[i], sample_output, atol=1e-5)
+            assert torch.allclose(hx[i], sample_hx, atol=1e-5)
+
+
+def test_compile_fullgraph():
+    input_size = 8
+    input = torch.randn(5, 3, input_size)
+    timespans = torch.rand(5, 3)
+    for rnn in [
+        LTC(input_size, ncps.wirings.AutoNCP(10, 2), mixed_memory=True),
+        CfC(input_size, 16),
+        CfC(input_size, ncps.wirings.AutoNCP(10, 2)),
+    ]:
+        for ts in [None, timespans]:
+            torch._dynamo.reset()
+            # The eager backend only checks that the whole loop is captured in one graph
+            compiled = torch.compile(rnn, fullgraph=True, backend="eager")
+            compiled(input, timespans=ts)
+            # and that the graph is reused by subsequent calls
+            with torch._dynamo.config.patch(error_on_recompile=True):
+                output, _ = compiled(input, timespans=ts)
+            assert torch.allclose(output, rnn(input, timespans=ts)[0], atol=1e-6)
+
+
+def test_ltc_vmap_functional_call():
+    input_size = 8
+    models = [
+        LTC(input_size, ncps.wirings.AutoNCP(10, 2), batch_first=True) for _ in range(3)
+    ]
+    params = torch.func.stack_module_state(models)[0]
+    input = torch.randn(5, 3, input_size)
+
+    def forward(params, input):
+        return torch.func.functional_call(models[0], params, (input,))[0]
+
+    output = torch.func.vmap(forward, in_dims=(0, None))(params, input)
+    for i, model in enumerate(models):
+        assert torch.allclose(output[i], model(input)[0], atol=1e-6)
+
+
+def test_wired_cfc_cell_packed_step():
+    input_size = 8
+    for wiring, mode in [
+        (ncps.wirings.NCP(10, 10, 8, 6, 6, 4, 6), "default"),
+        (ncps.wirings.AutoNCP(16, 2), "pure"),
+        (ncps.wirings.AutoNCP(16, 2), "no_gate"),
+    ]:
+        cell = ncps.torch.WiredCfCCell(input_size, wiring, mode)
+        input = torch.randn(5, input_size)
+        hx = torch.randn(5, cell.state_size)
+        ts = torch.rand(5, 1)
+        h, new_hx = cell(input, hx, ts)
+        (h.sum() + new_hx.sum()).backward()
+        grads = [p.grad.clone() for p in cell.parameters() if p.requires_grad]
+        cell.zero_grad()
+
+        split_weights = cell._split_weights()
+        packed_h, packed_hx = cell._step(
+            cell._project_inputs(input, split_weights), hx, ts, split_weights
+        )
+        (packed_h.sum() + packed_hx.sum()).backward()
+        packed_grads = [p.grad for p in cell.parameters() if p.requires_grad]
+        assert torch.allclose(h, packed_h, atol=1e-6)
+        assert torch.allclose(new_hx, packed_hx, atol=1e-6)
+        for grad, packed_grad in zip(grads, packed_grads):
+            assert torch.allclose(grad, packed_grad, atol=1e-5)
+
+
+def test_cfc_cell_loads_unstacked_heads():
+    input_size = 8
+    for mode, backbone_layers in [("default", 1), ("pure", 1), ("no_gate", 0)]:
+        cell = ncps.torch.CfCCell(input_size, 16, mode=mode, backbone_layers=backbone_layers)
+        # State dict in the format with one layer per head
+        state_dict = cell.state_dict()
+        names = ["ff1"] if mode == "pure" else ["ff1", "ff2", "time_a", "time_b"]
+        for param in ["weight", "bias"]:
+            heads = state_dict.pop(f"heads.{param}").chunk(len(names), 0)
+            for name, head in zip(names, heads):
+                state_dict[f"{name}.{param}"] = head
+        loaded = ncps.torch.CfCCell(input_size, 16, mode=mode, backbone_layers=backbone_layers)
+        loaded.load_state_dict(state_dict)
+        input = torch.randn(5, input_size)
+        hx = torch.randn(5, 16)
+        assert torch.equal(cell(input, hx, 1.0)[0], loaded(input, hx, 1.0)[0])
+
+
     # def __init__(
     #         self,
     #         input_size,
@@ -15,6 +15,7 @@
 
 import torch
 from torch import nn
+from torch.utils.checkpoint import checkpoint
 from typing import Optional, Union
 import ncps
 from . import CfCCell, WiredCfCCell
@@ -35,6 +36,7 @@ class CfC(nn.Module):
         backbone_units: Optional[int] = None,
         backbone_layers: Optional[int] = None,
         backbone_dropout: Optional[int] = None,
+        checkpoint_every: Optional[int] = None,
     ):
         """Applies a `Closed-form Continuous-time <https://arxiv.org/abs/2106.13898>`_ RNN to an input sequence.
 
@@ -58,6 +60,7 @@ class CfC(nn.Module):
         :param backbone_units: Number of hidden units in the backbone layer (default 128)
         :param backbone_layers: Number of backbone layers (default 1)
         :param backbone_dropout: Dropout rate in the backbone layers (default 0)
+        :param checkpoint_every: If not None, the sequence is processed in blocks of this many time-steps, whose activations are recomputed during the backward pass (activation checkpointing). Reduces the memory of the autograd graph from O(seq_len) to O(seq_len/checkpoint_every + checkpoint_every) time-steps
         """
 
         super(CfC, self).__init__()
@@ -66,6 +69,11 @@ class CfC(nn.Module):
         self.proj_size = proj_size
         self.batch_first = batch_first
         self.return_sequences = return_sequences
+        if checkpoint_every is not None and checkpoint_every < 1:
+            raise ValueError(
+                f"Invalid checkpoint_every {checkpoint_every}, expected a positive integer or None"
+            )
+        self.checkpoint_every = checkpoint_every
 
         if isinstance(units, ncps.wirings.Wiring):
             self.wired_mode = True
@@ -159,26 +167,34 @@ class CfC(nn.Module):
                 h_state = h_state.unsqueeze(0)
                 c_state = c_state.unsqueeze(0) if c_state is not None else None
 
-        output_sequence = []
-        for t in range(seq_len):
-            if self.batch_first:
-                inputs = input[:, t]
-                ts = 1.0 if timespans is None else timespans[:, t].squeeze()
-            else:
-                inputs = input[t]
-                ts = 1.0 if timespans is None else timespans[t].squeeze()
-
-            if self.use_mixed:
-                h_state, c_state = self.lstm(inputs, (h_state, c_state))
-            h_out, h_state = self.rnn_cell.forward(inputs, h_state, ts)
-            if self.return_sequences:
-                output_sequence.append(self.fc(h_out))
-
-        if self.return_sequences:
-            stack_dim = 1 if self.batch_first else 0
-            readout = torch.stack(output_sequence, dim=stack_dim)
+        # Sequence-level fast path: the input halves of the first layer of the
+        # cell (and of the LSTM) are computed for all time-steps as one large
+        # matmul, only the hidden state matmuls remain inside the loop
+        split_weights = self.rnn_cell._split_weights()
+        input_projection = self.rnn_cell._project_inputs(input, split_weights)
+        lstm_projection = self.lstm._project_inputs(input) if self.use_mixed else None
+        if self.checkpoint_every is None or not torch.is_grad_enabled():
+            outputs, h_state, c_state = self._forward_steps(
+                input_projection, lstm_projection, timespans, h_state, c_state, split_weights
+            )
         else:
-            readout = self.fc(h_out)
+            blocks = []
+            for start in range(0, seq_len, self.checkpoint_every):
+                block = slice(start, start + self.checkpoint_every)
+                outputs, h_state, c_state = checkpoint(
+                    self._forward_steps,
+                    self._time_slice(input_projection, block),
+                    self._time_slice(lstm_projection, block),
+                    self._time_slice(timespans, block),
+                    h_state,
+                    c_state,
+                    split_weights,
+                    use_reentrant=False,
+                )
+                blocks.append(outputs)
+            if self.return_sequences:
+                outputs = torch.cat(blocks, dim=seq_dim)
+        readout = self.fc(outputs)
         hx = (h_state, c_state) if self.use_mixed else h_state
 
         if not is_batched:
@@ -186,4 +202,47 @@ class CfC(nn.Module):
             readout = readout.squeeze(batch_dim)
             hx = (h_state[0], c_state[0]) if self.use_mixed else h_state[0]
 
-        return readout, hx
\ No newline at end of file
+        return readout, hx
+
+    def _time_slice(self, x, block):
+        if x is None:
+            return None
+        return x[:, block] if self.batch_first else x[block]
+
+    def _unbind_time(self, x):
+        # Unbinding once keeps the backward pass linear in the sequence length,
+        # indexing every time-step would scatter into a full-size gradient each
+        return x.unbind(1 if self.batch_first else 0)
+
+    def _elapsed_times(self, timespans, seq_len):
+        # Per-step elapsed times, resolved once per sequence so that the loop
+        # body does not branch. Tensors are brought into shape (B, 1) to
+        # broadcast over the units of the state
+        if timespans is None:
+            return [1.0] * seq_len
+        return self._unbind_time(timespans.reshape(*timespans.shape[:2], 1))
+
+    def _forward_steps(
+        self, input_projection, lstm_projection, timespans, h_state, c_state, split_weights
+    ):
+        seq_dim = 1 if self.batch_first else 0
+        projections = self._unbind_time(input_projection)
+        if self.use_mixed:
+            lstm_projections = self._unbind_time(lstm_projection)
+        elapsed_times = self._elapsed_times(timespans, len(projections))
+        output_sequence = []
+        for t in range(len(projections)):
+            ts = elapsed_times[t]
+            if self.use_mixed:
+                h_state, c_state = self.lstm._step(lstm_projections[t], (h_state, c_state))
+            h_out, h_state = self.rnn_cell._step(
+                projections[t], h_state, ts, split_weights
+            )
+            if self.return_sequences:
+                output_sequence.append(h_out)
+
+        if self.return_sequences:
+            outputs = torch.stack(output_sequence, dim=seq_dim)
+        else:
+            outputs = h_out
+        return outputs, h_state, c_state
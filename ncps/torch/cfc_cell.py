@@ -114,7 +114,19 @@ class CfCCell(nn.Module):
             self.hidden_size + input_size if backbone_layers == 0 else backbone_units
         )
 
-        self.ff1 = nn.Linear(cat_shape, hidden_size)
+        # ff1 [, ff2, time_a, time_b] stacked row-wise into a single layer, so that
+        # all heads are evaluated by one matmul
+        self._num_heads = 1 if self.mode == "pure" else 4
+        self.heads = nn.Linear(cat_shape, self._num_heads * hidden_size)
+        if self.sparsity_mask is not None:
+            # Only ff1 and ff2 are sparse
+            dense = torch.ones_like(self.sparsity_mask)
+            heads_mask = [self.sparsity_mask, self.sparsity_mask, dense, dense]
+            self.register_buffer(
+                "_heads_mask",
+                torch.cat(heads_mask[: self._num_heads], 0),
+                persistent=False,
+            )
         if self.mode == "pure":
             self.w_tau = torch.nn.Parameter(
                 data=torch.zeros(1, self.hidden_size), requires_grad=True
@@ -122,25 +134,63 @@ class CfCCell(nn.Module):
             self.A = torch.nn.Parameter(
                 data=torch.ones(1, self.hidden_size), requires_grad=True
             )
-        else:
-            self.ff2 = nn.Linear(cat_shape, hidden_size)
-            self.time_a = nn.Linear(cat_shape, hidden_size)
-            self.time_b = nn.Linear(cat_shape, hidden_size)
         self.init_weights()
 
     def init_weights(self):
         for w in self.parameters():
             if w.dim() == 2 and w.requires_grad:
-                torch.nn.init.xavier_uniform_(w)
-
-    def forward(self, input, hx, ts):
-        x = torch.cat([input, hx], 1)
+                if w is self.heads.weight:
+                    # Same initialization as if each head was a separate layer
+                    for head in w.data.chunk(self._num_heads, 0):
+                        torch.nn.init.xavier_uniform_(head)
+                else:
+                    torch.nn.init.xavier_uniform_(w)
+
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        # Checkpoints from before the heads were stacked store them as separate layers
+        names = ["ff1"] if self.mode == "pure" else ["ff1", "ff2", "time_a", "time_b"]
+        if prefix + "ff1.weight" in state_dict:
+            for param in ["weight", "bias"]:
+                state_dict[prefix + "heads." + param] = torch.cat(
+                    [state_dict.pop(f"{prefix}{name}.{param}") for name in names], 0
+                )
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def _head_weights(self):
+        """Returns the (masked) weight and bias of the heads, stacked in the order ff1, ff2, time_a, time_b"""
+        if self.sparsity_mask is None:
+            return self.heads.weight, self.heads.bias
+        return self.heads.weight * self._heads_mask, self.heads.bias
+
+    def _split_weights(self):
+        """Splits the layer applied to the concatenation ``[input, hx]`` into its input and recurrent part.
+
+        Returns a tuple (input weight, recurrent weight, bias, heads). The layer
+        is the first backbone layer, or the stacked heads if there is no
+        backbone. ``heads`` is the (masked) weight and bias of the heads, so the
+        mask is applied once per sequence instead of once per time-step.
+        """
+        heads = self._head_weights()
         if self.backbone_layers > 0:
-            x = self.backbone(x)
-        if self.sparsity_mask is not None:
-            ff1 = F.linear(x, self.ff1.weight * self.sparsity_mask, self.ff1.bias)
+            weight, bias = self.backbone[0].weight, self.backbone[0].bias
         else:
-            ff1 = self.ff1(x)
+            weight, bias = heads
+        return weight[:, : self.input_size], weight[:, self.input_size :], bias, heads
+
+    def _project_inputs(self, input, split_weights):
+        """Input half of the first layer, can be applied to all time-steps of a sequence at once"""
+        input_weight, _, bias, _ = split_weights
+        return F.linear(input, input_weight, bias)
+
+    def _step(self, input_projection, hx, ts, split_weights):
+        """Same as `forward`, but with the input half of the first layer precomputed by `_project_inputs`"""
+        _, recurrent_weight, _, heads = split_weights
+        x = input_projection + F.linear(hx, recurrent_weight)
+        if self.backbone_layers > 0:
+            x = F.linear(self.backbone[1:](x), *heads)
+        return self._update(*x.chunk(self._num_heads, 1), ts=ts)
+
+    def _update(self, ff1, ff2=None, t_a=None, t_b=None, ts=1.0):
         if self.mode == "pure":
             # Solution
             new_hidden = (
@@ -151,17 +201,18 @@ class CfCCell(nn.Module):
             )
         else:
             # Cfc
-            if self.sparsity_mask is not None:
-                ff2 = F.linear(x, self.ff2.weight * self.sparsity_mask, self.ff2.bias)
-            else:
-                ff2 = self.ff2(x)
             ff1 = self.tanh(ff1)
             ff2 = self.tanh(ff2)
-            t_a = self.time_a(x)
-            t_b = self.time_b(x)
             t_interp = self.sigmoid(t_a * ts + t_b)
             if self.mode == "no_gate":
                 new_hidden = ff1 + t_interp * ff2
             else:
                 new_hidden = ff1 * (1.0 - t_interp) + t_interp * ff2
-        return new_hidden, new_hidden
\ No newline at end of file
+        return new_hidden, new_hidden
+
+    def forward(self, input, hx, ts):
+        x = torch.cat([input, hx], 1)
+        if self.backbone_layers > 0:
+            x = self.backbone(x)
+        x = F.linear(x, *self._head_weights())
+        return self._update(*x.chunk(self._num_heads, 1), ts=ts)
@@ -25,9 +25,16 @@ class LSTMCell(nn.Module):
             else:
                 torch.nn.init.orthogonal_(w)
 
+    def _project_inputs(self, inputs):
+        # Can be applied to all time-steps of a sequence at once
+        return self.input_map(inputs)
+
     def forward(self, inputs, states):
+        return self._step(self._project_inputs(inputs), states)
+
+    def _step(self, input_projection, states):
         output_state, cell_state = states
-        z = self.input_map(inputs) + self.recurrent_map(output_state)
+        z = input_projection + self.recurrent_map(output_state)
         i, ig, fg, og = z.chunk(4, 1)
 
         input_activation = self.tanh(i)
@@ -14,6 +14,8 @@
 import numpy as np
 import torch
 from torch import nn
+from torch.utils.checkpoint import checkpoint
+from contextlib import nullcontext
 from typing import Optional, Union
 import ncps
 from . import CfCCell, LTCCell
@@ -34,6 +36,11 @@ class LTC(nn.Module):
         epsilon=1e-8,
         implicit_param_constraints=True,
         use_swish_activation=False,
+        sparse_synapses=False,
+        fused_solver=False,
+        ode_tolerance=None,
+        memory_efficient_backward=False,
+        checkpoint_every: Optional[int] = None,
     ):
         """Applies a `Liquid time-constant (LTC) <https://ojs.aaai.org/index.php/AAAI/article/view/16936>`_ RNN to an input sequence.
 
@@ -73,6 +80,11 @@ class LTC(nn.Module):
         :param epsilon:
         :param implicit_param_constraints:
         :param use_swish_activation:
+        :param sparse_synapses: Whether the LTC cell stores and evaluates only the synapses present in the wiring (see `ncps.torch.LTCCell`)
+        :param fused_solver: Whether the ODE unfolds of the LTC cell are compiled into fused kernels with ``torch.compile``
+        :param ode_tolerance: If not None, the LTC cell stops unfolding the ODE early in evaluation mode once the state changes by less than this tolerance. The unfolds actually spent are tracked by ``rnn_cell.mean_ode_unfolds``
+        :param memory_efficient_backward: Whether the LTC cell recomputes the ODE unfolds during the backward pass instead of storing their activations (see `ncps.torch.LTCCell`)
+        :param checkpoint_every: If not None, the sequence is processed in blocks of this many time-steps, whose activations are recomputed during the backward pass (activation checkpointing). Reduces the memory of the autograd graph from O(seq_len) to O(seq_len/checkpoint_every + checkpoint_every) time-steps
         """
 
         super(LTC, self).__init__()
@@ -80,6 +92,11 @@ class LTC(nn.Module):
         self.wiring_or_units = units
         self.batch_first = batch_first
         self.return_sequences = return_sequences
+        if checkpoint_every is not None and checkpoint_every < 1:
+            raise ValueError(
+                f"Invalid checkpoint_every {checkpoint_every}, expected a positive integer or None"
+            )
+        self.checkpoint_every = checkpoint_every
 
         if isinstance(units, ncps.wirings.Wiring):
             wiring = units
@@ -94,6 +111,10 @@ class LTC(nn.Module):
             epsilon=epsilon,
             implicit_param_constraints=implicit_param_constraints,
             use_swish_activation=use_swish_activation,
+            sparse_synapses=sparse_synapses,
+            fused_solver=fused_solver,
+            ode_tolerance=ode_tolerance,
+            memory_efficient_backward=memory_efficient_backward,
         )
         self._wiring = wiring
         self.use_mixed = mixed_memory
@@ -174,26 +195,39 @@ class LTC(nn.Module):
                 h_state = h_state.unsqueeze(0)
                 c_state = c_state.unsqueeze(0) if c_state is not None else None
 
-        output_sequence = []
-        for t in range(seq_len):
-            if self.batch_first:
-                inputs = input[:, t]
-                ts = 1.0 if timespans is None else timespans[:, t].squeeze()
-            else:
-                inputs = input[t]
-                ts = 1.0 if timespans is None else timespans[t].squeeze()
-
-            if self.use_mixed:
-                h_state, c_state = self.lstm(inputs, (h_state, c_state))
-            h_out, h_state = self.rnn_cell.forward(inputs, h_state, ts)
-            if self.return_sequences:
-                output_sequence.append(h_out)
-
-        if self.return_sequences:
-            stack_dim = 1 if self.batch_first else 0
-            readout = torch.stack(output_sequence, dim=stack_dim)
+        # The parameter-only terms of the ODE solver are shared by all time-steps
+        invariants = self.rnn_cell._solver_invariants()
+        # The sensory synapses only depend on the inputs, hence they are
+        # evaluated for all time-steps at once, before the recurrence
+        sensory_currents = self.rnn_cell._sensory_currents(
+            self.rnn_cell._map_inputs(input), invariants
+        )
+        # Likewise the input half of the LSTM gates
+        lstm_projection = self.lstm._project_inputs(input) if self.use_mixed else None
+        if self.checkpoint_every is None or not torch.is_grad_enabled():
+            states, h_state, c_state = self._forward_steps(
+                lstm_projection, sensory_currents, timespans, h_state, c_state, invariants
+            )
         else:
-            readout = h_out
+            blocks = []
+            for start in range(0, seq_len, self.checkpoint_every):
+                block = slice(start, start + self.checkpoint_every)
+                states, h_state, c_state = checkpoint(
+                    self._forward_steps,
+                    self._time_slice(lstm_projection, block),
+                    [self._time_slice(x, block) for x in sensory_currents],
+                    self._time_slice(timespans, block),
+                    h_state,
+                    c_state,
+                    invariants,
+                    use_reentrant=False,
+                    context_fn=self._checkpoint_contexts,
+                )
+                blocks.append(states)
+            if self.return_sequences:
+                states = torch.cat(blocks, dim=seq_dim)
+        # The output mapping is applied to all time-steps at once as well
+        readout = self.rnn_cell._map_outputs(states)
         hx = (h_state, c_state) if self.use_mixed else h_state
 
         if not is_batched:
@@ -201,4 +235,52 @@ class LTC(nn.Module):
             readout = readout.squeeze(batch_dim)
             hx = (h_state[0], c_state[0]) if self.use_mixed else h_state[0]
 
-        return readout, hx
\ No newline at end of file
+        return readout, hx
+
+    def _checkpoint_contexts(self):
+        # (forward, recomputation), the recomputed time-steps are not counted again
+        return nullcontext(), self.rnn_cell._recompute_context()
+
+    def _time_slice(self, x, block):
+        if x is None:
+            return None
+        return x[:, block] if self.batch_first else x[block]
+
+    def _unbind_time(self, x):
+        # Unbinding once keeps the backward pass linear in the sequence length,
+        # indexing every time-step would scatter into a full-size gradient each
+        return x.unbind(1 if self.batch_first else 0)
+
+    def _elapsed_times(self, timespans, seq_len):
+        # Per-step elapsed times, resolved once per sequence so that the loop
+        # body does not branch. Tensors are brought into shape (B, 1) to
+        # broadcast over the units of the state
+        if timespans is None:
+            return [1.0] * seq_len
+        return self._unbind_time(timespans.reshape(*timespans.shape[:2], 1))
+
+    def _forward_steps(
+        self, lstm_projection, sensory_currents, timespans, h_state, c_state, invariants
+    ):
+        seq_dim = 1 if self.batch_first else 0
+        numerators, denominators = [self._unbind_time(x) for x in sensory_currents]
+        if self.use_mixed:
+            lstm_projections = self._unbind_time(lstm_projection)
+
+        elapsed_times = self._elapsed_times(timespans, len(numerators))
+        state_sequence = []
+        for t in range(len(numerators)):
+            ts = elapsed_times[t]
+            if self.use_mixed:
+                h_state, c_state = self.lstm._step(lstm_projections[t], (h_state, c_state))
+            h_state = self.rnn_cell._recurrent_solver(
+                h_state, numerators[t], denominators[t], ts, invariants
+            )
+            if self.return_sequences:
+                state_sequence.append(h_state)
+
+        if self.return_sequences:
+            states = torch.stack(state_sequence, dim=seq_dim)
+        else:
+            states = h_state
+        return states, h_state, c_state
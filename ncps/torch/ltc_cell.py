@@ -15,9 +15,148 @@
 import torch
 import torch.nn as nn
 import numpy as np
+from contextlib import contextmanager
 from typing import Optional, Union
 
 
+def _synaptic_currents(v_pre, w, w_erev, mu, sigma, beta, src, dest, swish, size):
+    """Returns the (numerator, denominator) contributions of a set of synapses.
+
+    ``w`` and ``w_erev`` are expected to be positive and masked already. If
+    ``src`` is None the synapses are given as dense ``[pre, post]`` matrices,
+    otherwise as lists of the synapses present in the wiring.
+    """
+    if src is None:
+        x = sigma * (torch.unsqueeze(v_pre, -1) - mu)  # For broadcasting
+    else:
+        # Gather the presynaptic potentials of the existing synapses only
+        x = sigma * (v_pre[..., src] - mu)
+    if swish:
+        activation = x * torch.sigmoid(beta * x)
+    else:
+        activation = torch.sigmoid(x)
+
+    if src is None:
+        # Reduce over the presynaptic neurons
+        w_numerator = torch.sum(w_erev * activation, dim=-2)
+        w_denominator = torch.sum(w * activation, dim=-2)
+    else:
+        # Scatter-add onto the postsynaptic neurons
+        shape = v_pre.shape[:-1] + (size,)
+        w_numerator = v_pre.new_zeros(shape).index_add_(-1, dest, w_erev * activation)
+        w_denominator = v_pre.new_zeros(shape).index_add_(-1, dest, w * activation)
+    return w_numerator, w_denominator
+
+
+def _ltc_unfold_step(
+    v_pre, cm_t, numerator_const, denominator_const, w, w_erev, mu, sigma, beta, src, dest, swish: bool
+):
+    w_numerator, w_denominator = _synaptic_currents(
+        v_pre, w, w_erev, mu, sigma, beta, src, dest, swish, v_pre.shape[-1]
+    )
+    numerator = cm_t * v_pre + numerator_const + w_numerator
+    denominator = denominator_const + w_denominator
+    return numerator / denominator
+
+
+def _ltc_unfold(
+    v_pre,
+    cm_t,
+    numerator_const,
+    denominator_const,
+    w,
+    w_erev,
+    mu,
+    sigma,
+    beta,
+    src,
+    dest,
+    ode_unfolds: int,
+    swish: bool,
+):
+    """Unfolds the semi-implicit Euler solver ``ode_unfolds`` times.
+
+    All terms that do not depend on ``v_pre`` are passed in precomputed
+    (``numerator_const``, ``denominator_const``), such that each unfold
+    only evaluates the recurrent synapses.
+    """
+    for _ in range(ode_unfolds):
+        v_pre = _ltc_unfold_step(
+            v_pre, cm_t, numerator_const, denominator_const, w, w_erev, mu, sigma, beta, src, dest, swish
+        )
+    return v_pre
+
+
+class _RecomputedLTCUnfold(torch.autograd.Function):
+    """Unfolds the ODE solver without keeping the autograd graph of the unfolds alive.
+
+    The forward pass only stores the initial state of the time-step (plus
+    references to the inputs). The backward pass recomputes the intermediate
+    states and back-propagates through one unfold at a time, such that only
+    the ``[batch, units, units]`` activations of a single unfold exist at once.
+    """
+
+    @staticmethod
+    def forward(ctx, v_pre, cm_t, numerator_const, denominator_const, w, w_erev, mu, sigma, beta, src, dest, ode_unfolds, swish, step):
+        ctx.save_for_backward(
+            v_pre, cm_t, numerator_const, denominator_const, w, w_erev, mu, sigma, beta
+        )
+        ctx.src, ctx.dest = src, dest
+        ctx.ode_unfolds, ctx.swish, ctx.step = ode_unfolds, swish, step
+        for _ in range(ode_unfolds):
+            v_pre = step(
+                v_pre, cm_t, numerator_const, denominator_const, w, w_erev, mu, sigma, beta, src, dest, swish
+            )
+        return v_pre
+
+    @staticmethod
+    def backward(ctx, grad_v):
+        v_pre, *inputs = ctx.saved_tensors
+        # Leaves of the per-unfold graphs, created once for all unfolds
+        inputs = [
+            None if x is None else x.detach().requires_grad_(needs_grad)
+            for x, needs_grad in zip(inputs, ctx.needs_input_grad[1:9])
+        ]
+        differentiable = [x for x in inputs if x is not None and x.requires_grad]
+
+        states = [v_pre]
+        with torch.no_grad():
+            for _ in range(ctx.ode_unfolds - 1):
+                states.append(
+                    ctx.step(states[-1], *inputs, ctx.src, ctx.dest, ctx.swish)
+                )
+
+        grads = [None] * len(differentiable)
+        for v in reversed(states):
+            with torch.enable_grad():
+                v = v.detach().requires_grad_(True)
+                v_next = ctx.step(v, *inputs, ctx.src, ctx.dest, ctx.swish)
+            step_grads = torch.autograd.grad(
+                v_next, [v] + differentiable, grad_v, allow_unused=True
+            )
+            grad_v = step_grads[0]
+            grads = [
+                g if acc is None else (acc if g is None else acc + g)
+                for acc, g in zip(grads, step_grads[1:])
+            ]
+
+        grads = iter(grads)
+        input_grads = [
+            next(grads) if x is not None and x.requires_grad else None for x in inputs
+        ]
+        return (grad_v, *input_grads, None, None, None, None, None)
+
+
+_compiled_functions = {}
+
+
+def _compiled(fn):
+    # Compiled lazily, such that importing ncps does not initialize the compiler stack
+    if fn not in _compiled_functions:
+        _compiled_functions[fn] = torch.compile(fn)
+    return _compiled_functions[fn]
+
+
 class LTCCell(nn.Module):
     def __init__(
         self,
@@ -29,6 +168,10 @@ class LTCCell(nn.Module):
         epsilon=1e-8,
         implicit_param_constraints=False,
         use_swish_activation=False,
+        sparse_synapses=False,
+        fused_solver=False,
+        ode_tolerance=None,
+        memory_efficient_backward=False,
     ):
         """A `Liquid time-constant (LTC) <https://ojs.aaai.org/index.php/AAAI/article/view/16936>`_ cell.
 
@@ -44,6 +187,10 @@ class LTCCell(nn.Module):
         :param epsilon:
         :param implicit_param_constraints:
         :param use_swish_activation:
+        :param sparse_synapses: If True, the synapse parameters are only stored for the synapses present in the wiring and the ODE solver operates on this edge list instead of dense ``[units, units]`` matrices (beneficial for large, sparse wirings)
+        :param fused_solver: If True, the ODE unfolds are compiled with ``torch.compile`` into a few fused kernels (the first call triggers the compilation)
+        :param ode_tolerance: If not None, the cell stops unfolding the ODE as soon as the maximum absolute state change of an unfold falls below this tolerance (at most ``ode_unfolds`` unfolds are performed). Only applies in evaluation mode; in training mode always ``ode_unfolds`` unfolds are performed, such that the gradients are well defined. The number of unfolds actually spent is tracked by ``ode_steps`` and ``ode_unfolds_spent`` (except inside ``torch.compile``)
+        :param memory_efficient_backward: If True, the autograd graph of the ODE unfolds is not stored during the forward pass, but recomputed one unfold at a time during the backward pass. This reduces the activation memory of a time-step from O(unfolds * batch * units^2) to O(batch * units) at the cost of one additional forward pass
         """
         super(LTCCell, self).__init__()
         if in_features is not None:
@@ -57,6 +204,14 @@ class LTCCell(nn.Module):
         )
         self._implicit_param_constraints = implicit_param_constraints
         self._use_swish_activation = use_swish_activation
+        self._sparse_synapses = sparse_synapses
+        self._fused_solver = fused_solver
+        if ode_tolerance is not None and ode_tolerance <= 0:
+            raise ValueError(
+                f"Invalid ode_tolerance {ode_tolerance}, expected a positive value or None"
+            )
+        self._ode_tolerance = ode_tolerance
+        self._memory_efficient_backward = memory_efficient_backward
         self._init_ranges = {
             "gleak": (0.001, 1.0),
             "vleak": (-0.2, 0.2),
@@ -76,6 +231,9 @@ class LTCCell(nn.Module):
         self._epsilon = epsilon
         self._clip = torch.nn.ReLU()
         self._allocate_parameters()
+        self.reset_ode_stats()
+        # set while activation checkpointing recomputes time-steps in the backward pass
+        self._recomputing = False
 
     @property
     def state_size(self):
@@ -93,6 +251,35 @@ class LTCCell(nn.Module):
     def output_size(self):
         return self.motor_size
 
+    @property
+    def mean_ode_unfolds(self):
+        """Average number of ODE unfolds spent per time-step since the last `reset_ode_stats()` call"""
+        if self.ode_steps == 0:
+            return 0.0
+        return self.ode_unfolds_spent / self.ode_steps
+
+    def reset_ode_stats(self):
+        self.ode_steps = 0
+        self.ode_unfolds_spent = 0
+
+    def _count_unfolds(self, unfolds):
+        # Not tracked inside torch.compile, which would specialize the graph
+        # on the values of the counters and recompile on every call, nor for
+        # the time-steps recomputed by activation checkpointing, which were
+        # already counted in the forward pass
+        if not torch.compiler.is_compiling() and not self._recomputing:
+            self.ode_steps += 1
+            self.ode_unfolds_spent += unfolds
+
+    @contextmanager
+    def _recompute_context(self):
+        """Context of the recomputation of time-steps by activation checkpointing, see `ncps.torch.LTC`"""
+        self._recomputing = True
+        try:
+            yield
+        finally:
+            self._recomputing = False
+
     @property
     def synapse_count(self):
         return np.sum(np.abs(self._wiring.adjacency_matrix))
@@ -101,6 +288,12 @@ class LTCCell(nn.Module):
     def sensory_synapse_count(self):
         return np.sum(np.abs(self._wiring.adjacency_matrix))
 
+    @property
+    def _params(self):
+        # Looked up on every access instead of holding on to the Parameter objects,
+        # such that the tensors swapped in by torch.func.functional_call are used
+        return {name: getattr(self, name) for name in self._parameters}
+
     def add_weight(self, name, init_value, requires_grad=True):
         param = torch.nn.Parameter(init_value, requires_grad=requires_grad)
         self.register_parameter(name, param)
@@ -113,70 +306,96 @@ class LTCCell(nn.Module):
         else:
             return torch.rand(*shape) * (maxval - minval) + minval
 
+    def _allocate_synapse_lists(self):
+        # Source/destination neuron of every synapse present in the wiring.
+        # The indices are derived from the wiring, hence not part of the state dict
+        src, dest = np.nonzero(self._wiring.adjacency_matrix)
+        sensory_src, sensory_dest = np.nonzero(self._wiring.sensory_adjacency_matrix)
+        for name, index in [
+            ("synapse_src", src),
+            ("synapse_dest", dest),
+            ("sensory_synapse_src", sensory_src),
+            ("sensory_synapse_dest", sensory_dest),
+        ]:
+            self.register_buffer(
+                name, torch.as_tensor(index, dtype=torch.long), persistent=False
+            )
+
+    def _gather_synapses(self, matrix, sensory=False):
+        """Converts a dense ``[pre, post]`` synapse matrix into the representation used by the cell"""
+        if not self._sparse_synapses:
+            return matrix
+        if sensory:
+            return matrix[self.sensory_synapse_src, self.sensory_synapse_dest]
+        return matrix[self.synapse_src, self.synapse_dest]
+
     def _allocate_parameters(self):
-        self._params = {}
-        self._params["gleak"] = self.add_weight(
+        self.add_weight(
             name="gleak", init_value=self._get_init_value((self.state_size,), "gleak")
         )
-        self._params["vleak"] = self.add_weight(
+        self.add_weight(
             name="vleak", init_value=self._get_init_value((self.state_size,), "vleak")
         )
-        self._params["cm"] = self.add_weight(
+        self.add_weight(
             name="cm", init_value=self._get_init_value((self.state_size,), "cm")
         )
-        self._params["sigma"] = self.add_weight(
+        if self._sparse_synapses:
+            self._allocate_synapse_lists()
+            synapse_shape = (self.synapse_src.numel(),)
+            sensory_synapse_shape = (self.sensory_synapse_src.numel(),)
+        else:
+            synapse_shape = (self.state_size, self.state_size)
+            sensory_synapse_shape = (self.sensory_size, self.state_size)
+        self.add_weight(
             name="sigma",
-            init_value=self._get_init_value(
-                (self.state_size, self.state_size), "sigma"
-            ),
+            init_value=self._get_init_value(synapse_shape, "sigma"),
         )
-        self._params["mu"] = self.add_weight(
+        self.add_weight(
             name="mu",
-            init_value=self._get_init_value((self.state_size, self.state_size), "mu"),
+            init_value=self._get_init_value(synapse_shape, "mu"),
         )
-        self._params["w"] = self.add_weight(
+        self.add_weight(
             name="w",
-            init_value=self._get_init_value((self.state_size, self.state_size), "w"),
+            init_value=self._get_init_value(synapse_shape, "w"),
         )
-        self._params["erev"] = self.add_weight(
+        self.add_weight(
             name="erev",
-            init_value=torch.Tensor(self._wiring.erev_initializer()),
+            init_value=self._gather_synapses(
+                torch.Tensor(self._wiring.erev_initializer())
+            ),
         )
-        self._params["sensory_sigma"] = self.add_weight(
+        self.add_weight(
             name="sensory_sigma",
-            init_value=self._get_init_value(
-                (self.sensory_size, self.state_size), "sensory_sigma"
-            ),
+            init_value=self._get_init_value(sensory_synapse_shape, "sensory_sigma"),
         )
-        self._params["sensory_mu"] = self.add_weight(
+        self.add_weight(
             name="sensory_mu",
-            init_value=self._get_init_value(
-                (self.sensory_size, self.state_size), "sensory_mu"
-            ),
+            init_value=self._get_init_value(sensory_synapse_shape, "sensory_mu"),
         )
-        self._params["sensory_w"] = self.add_weight(
+        self.add_weight(
             name="sensory_w",
-            init_value=self._get_init_value(
-                (self.sensory_size, self.state_size), "sensory_w"
-            ),
+            init_value=self._get_init_value(sensory_synapse_shape, "sensory_w"),
         )
-        self._params["sensory_erev"] = self.add_weight(
+        self.add_weight(
             name="sensory_erev",
-            init_value=torch.Tensor(self._wiring.sensory_erev_initializer()),
+            init_value=self._gather_synapses(
+                torch.Tensor(self._wiring.sensory_erev_initializer()), sensory=True
+            ),
         )
 
-        self._params["sparsity_mask"] = self.add_weight(
-            "sparsity_mask",
-            init_value=torch.Tensor(np.abs(self._wiring.adjacency_matrix)),
-            requires_grad=False,
-        )
-        self._params["sensory_sparsity_mask"] = self.add_weight(
-            "sensory_sparsity_mask",
-            init_value=torch.Tensor(np.abs(self._wiring.sensory_adjacency_matrix)),
-            requires_grad=False,
-        )
+        if not self._sparse_synapses:
+            self.add_weight(
+                "sparsity_mask",
+                init_value=torch.Tensor(np.abs(self._wiring.adjacency_matrix)),
+                requires_grad=False,
+            )
+            self.add_weight(
+                "sensory_sparsity_mask",
+                init_value=torch.Tensor(np.abs(self._wiring.sensory_adjacency_matrix)),
+                requires_grad=False,
+            )
         if self._use_swish_activation:
-            self._params["swish_beta"] = self.add_weight(
+            self.add_weight(
                 "swish_beta",
                 init_value=self._get_init_value(
                     (1,), "swish_beta"
@@ -184,84 +403,151 @@ class LTCCell(nn.Module):
             )
 
         if self._input_mapping in ["affine", "linear"]:
-            self._params["input_w"] = self.add_weight(
+            self.add_weight(
                 name="input_w",
                 init_value=torch.ones((self.sensory_size,)),
             )
         if self._input_mapping == "affine":
-            self._params["input_b"] = self.add_weight(
+            self.add_weight(
                 name="input_b",
                 init_value=torch.zeros((self.sensory_size,)),
             )
 
         if self._output_mapping in ["affine", "linear"]:
-            self._params["output_w"] = self.add_weight(
+            self.add_weight(
                 name="output_w",
                 init_value=torch.ones((self.motor_size,)),
             )
         if self._output_mapping == "affine":
-            self._params["output_b"] = self.add_weight(
+            self.add_weight(
                 name="output_b",
                 init_value=torch.zeros((self.motor_size,)),
             )
 
-    def _sigmoid(self, v_pre, mu, sigma, beta):
-        v_pre = torch.unsqueeze(v_pre, -1)  # For broadcasting
-        mues = v_pre - mu
-        x = sigma * mues
-        if self._use_swish_activation:
-            return x * torch.sigmoid(beta * x)
-        return torch.sigmoid(x)
+    def _solver_invariants(self):
+        """Precomputes all terms of the ODE solver that only depend on the parameters.
 
-    def _ode_solver(self, inputs, state, elapsed_time):
-        v_pre = state
+        The result can be reused for every unfold and every time-step of a sequence.
+        """
+        gleak = self.make_positive_fn(self._params["gleak"])
+        w = self.make_positive_fn(self._params["w"])
+        sensory_w = self.make_positive_fn(self._params["sensory_w"])
+        if self._sparse_synapses:
+            src, dest = self.synapse_src, self.synapse_dest
+            sensory_src = self.sensory_synapse_src
+            sensory_dest = self.sensory_synapse_dest
+        else:
+            w = w * self._params["sparsity_mask"]
+            sensory_w = sensory_w * self._params["sensory_sparsity_mask"]
+            src, dest, sensory_src, sensory_dest = None, None, None, None
+        beta = self._params["swish_beta"] if self._use_swish_activation else None
+        return {
+            "cm": self.make_positive_fn(self._params["cm"]),
+            "gleak": gleak,
+            "gleak_vleak": gleak * self._params["vleak"],
+            "synapses": (
+                w,
+                w * self._params["erev"],
+                self._params["mu"],
+                self._params["sigma"],
+                beta,
+                src,
+                dest,
+            ),
+            "sensory_synapses": (
+                sensory_w,
+                sensory_w * self._params["sensory_erev"],
+                self._params["sensory_mu"],
+                self._params["sensory_sigma"],
+                beta,
+                sensory_src,
+                sensory_dest,
+            ),
+        }
 
-        # We can pre-compute the effects of the sensory neurons here
-        sensory_w_activation = self.make_positive_fn(
-            self._params["sensory_w"]
-        ) * self._sigmoid(
-            inputs, self._params["sensory_mu"],
-            self._params["sensory_sigma"], self._params["swish_beta"] if self._use_swish_activation else None
+    def _sensory_currents(self, inputs, invariants):
+        """Returns the (numerator, denominator) contributions of the sensory synapses.
 
-        )
-        sensory_w_activation = (
-            sensory_w_activation * self._params["sensory_sparsity_mask"]
+        ``inputs`` may have arbitrary leading dimensions, e.g., (B, L, F) to
+        process the sensory synapses of a whole sequence at once.
+        """
+        return _synaptic_currents(
+            inputs,
+            *invariants["sensory_synapses"],
+            self._use_swish_activation,
+            self.state_size,
         )
 
-        sensory_rev_activation = sensory_w_activation * self._params["sensory_erev"]
+    def _ode_solver(self, inputs, state, elapsed_time, invariants=None):
+        if invariants is None:
+            invariants = self._solver_invariants()
 
-        # Reduce over dimension 1 (=source sensory neurons)
-        w_numerator_sensory = torch.sum(sensory_rev_activation, dim=1)
-        w_denominator_sensory = torch.sum(sensory_w_activation, dim=1)
+        # We can pre-compute the effects of the sensory neurons here
+        w_numerator_sensory, w_denominator_sensory = self._sensory_currents(
+            inputs, invariants
+        )
+        return self._recurrent_solver(
+            state, w_numerator_sensory, w_denominator_sensory, elapsed_time, invariants
+        )
 
+    def _recurrent_solver(
+        self, state, w_numerator_sensory, w_denominator_sensory, elapsed_time, invariants
+    ):
         # cm/t is loop invariant
-        cm_t = self.make_positive_fn(self._params["cm"]) / (
-            elapsed_time / self._ode_unfolds
+        cm_t = invariants["cm"] / (elapsed_time / self._ode_unfolds)
+
+        # So are the leak and sensory terms (epsilon avoids dividing by 0)
+        numerator_const = invariants["gleak_vleak"] + w_numerator_sensory
+        denominator_const = (
+            cm_t + invariants["gleak"] + w_denominator_sensory + self._epsilon
         )
 
         # Unfold the multiply ODE multiple times into one RNN step
-        w_param = self.make_positive_fn(self._params["w"])
-        for t in range(self._ode_unfolds):
-            w_activation = w_param * self._sigmoid(
-                v_pre, self._params["mu"],
-                self._params["sigma"], self._params["swish_beta"] if self._use_swish_activation else None
+        if self._ode_tolerance is not None and not self.training:
+            return self._adaptive_unfold(
+                state, cm_t, numerator_const, denominator_const, invariants["synapses"]
             )
+        self._count_unfolds(self._ode_unfolds)
+        if self._memory_efficient_backward and torch.is_grad_enabled():
+            step = _compiled(_ltc_unfold_step) if self._fused_solver else _ltc_unfold_step
+            return _RecomputedLTCUnfold.apply(
+                state,
+                cm_t,
+                numerator_const,
+                denominator_const,
+                *invariants["synapses"],
+                self._ode_unfolds,
+                self._use_swish_activation,
+                step,
+            )
+        unfold = _compiled(_ltc_unfold) if self._fused_solver else _ltc_unfold
+        return unfold(
+            state,
+            cm_t,
+            numerator_const,
+            denominator_const,
+            *invariants["synapses"],
+            self._ode_unfolds,
+            self._use_swish_activation,
+        )
 
-            w_activation = w_activation * self._params["sparsity_mask"]
-
-            rev_activation = w_activation * self._params["erev"]
-
-            # Reduce over dimension 1 (=source neurons)
-            w_numerator = torch.sum(rev_activation, dim=1) + w_numerator_sensory
-            w_denominator = torch.sum(w_activation, dim=1) + w_denominator_sensory
-
-            gleak = self.make_positive_fn(self._params["gleak"])
-            numerator = cm_t * v_pre + gleak * self._params["vleak"] + w_numerator
-            denominator = cm_t + gleak + w_denominator
-
-            # Avoid dividing by 0
-            v_pre = numerator / (denominator + self._epsilon)
-
+    def _adaptive_unfold(self, v_pre, cm_t, numerator_const, denominator_const, synapses):
+        step = _compiled(_ltc_unfold_step) if self._fused_solver else _ltc_unfold_step
+        for unfold in range(1, self._ode_unfolds + 1):
+            v_next = step(
+                v_pre,
+                cm_t,
+                numerator_const,
+                denominator_const,
+                *synapses,
+                self._use_swish_activation,
+            )
+            # The whole batch has to settle before we stop early
+            converged = torch.max(torch.abs(v_next - v_pre)) < self._ode_tolerance
+            v_pre = v_next
+            if converged:
+                break
+        self._count_unfolds(unfold)
         return v_pre
 
     def _map_inputs(self, inputs):
@@ -274,7 +560,7 @@ class LTCCell(nn.Module):
     def _map_outputs(self, state):
         output = state
         if self.motor_size < self.state_size:
-            output = output[:, 0 : self.motor_size]  # slice
+            output = output[..., 0 : self.motor_size]  # slice
 
         if self._output_mapping in ["affine", "linear"]:
             output = output * self._params["output_w"]
@@ -291,11 +577,26 @@ class LTCCell(nn.Module):
             self._params["cm"].data = self._clip(self._params["cm"].data)
             self._params["gleak"].data = self._clip(self._params["gleak"].data)
 
-    def forward(self, inputs, states, elapsed_time=1.0):
+    def _load_from_state_dict(self, state_dict, prefix, *args, **kwargs):
+        if self._sparse_synapses and state_dict.get(prefix + "w", None) is not None:
+            if state_dict[prefix + "w"].dim() == 2:
+                # Checkpoint of a dense cell -> keep only the synapses of the wiring
+                for name in ["w", "mu", "sigma", "erev"]:
+                    state_dict[prefix + name] = self._gather_synapses(
+                        state_dict[prefix + name]
+                    )
+                    state_dict[prefix + "sensory_" + name] = self._gather_synapses(
+                        state_dict[prefix + "sensory_" + name], sensory=True
+                    )
+                state_dict.pop(prefix + "sparsity_mask", None)
+                state_dict.pop(prefix + "sensory_sparsity_mask", None)
+        super()._load_from_state_dict(state_dict, prefix, *args, **kwargs)
+
+    def forward(self, inputs, states, elapsed_time=1.0, invariants=None):
         # Regularly sampled mode (elapsed time = 1 second)
         inputs = self._map_inputs(inputs)
 
-        next_state = self._ode_solver(inputs, states, elapsed_time)
+        next_state = self._ode_solver(inputs, states, elapsed_time, invariants)
 
         outputs = self._map_outputs(next_state)
 
@@ -3,6 +3,7 @@
 import numpy as np
 import torch
 from torch import nn
+import torch.nn.functional as F
 
 from . import CfCCell
 from typing import Optional, Union
@@ -58,6 +59,20 @@ class WiredCfCCell(nn.Module):
             self._layers.append(rnn_cell)
             in_features = len(hidden_units)
 
+        # Column (state) and row (stacked heads) ranges of each layer in the
+        # packed block-sparse representation used by `_step`
+        self._state_slices = []
+        self._head_slices = []
+        state_offset, head_offset = 0, 0
+        for rnn_cell in self._layers:
+            size = rnn_cell.hidden_size
+            self._state_slices.append(slice(state_offset, state_offset + size))
+            self._head_slices.append(
+                slice(head_offset, head_offset + rnn_cell._num_heads * size)
+            )
+            state_offset += size
+            head_offset += rnn_cell._num_heads * size
+
     @property
     def state_size(self):
         return self._wiring.units
@@ -104,4 +119,42 @@ class WiredCfCCell(nn.Module):
             new_h_state.append(h)
 
         new_h_state = torch.cat(new_h_state, dim=1)
-        return h, new_h_state
\ No newline at end of file
+        return h, new_h_state
+
+    def _split_weights(self):
+        """Packs the masked weights of all layers into a block-sparse representation.
+
+        Returns a tuple (input weights, recurrent weight, bias). The input
+        weights are the per-layer weights applied to the external input (layer
+        0) or to the output of the previous layer. The recurrent weights of all
+        layers form the diagonal blocks of a single (heads, units) matrix, so the
+        recurrent part of every layer is computed by one matmul of the full state.
+        """
+        split_weights = [layer._split_weights() for layer in self._layers]
+        input_weights = [input_weight for input_weight, _, _, _ in split_weights]
+        recurrent_weight = torch.block_diag(
+            *[recurrent_weight for _, recurrent_weight, _, _ in split_weights]
+        )
+        bias = torch.cat([bias for _, _, bias, _ in split_weights], 0)
+        return input_weights, recurrent_weight, bias
+
+    def _project_inputs(self, input, split_weights):
+        # Only the first layer receives the external input, the biases of all
+        # layers are added by the recurrent matmul in `_step`
+        input_weights, _, _ = split_weights
+        return F.linear(input, input_weights[0])
+
+    def _step(self, input_projection, hx, timespans, split_weights):
+        """Same as `forward` on the packed weights of `_split_weights`, with the input projection of the first layer precomputed"""
+        input_weights, recurrent_weight, bias = split_weights
+        recurrent = F.linear(hx, recurrent_weight, bias)
+
+        new_h_state = torch.empty_like(hx)
+        x = input_projection
+        for i, layer in enumerate(self._layers):
+            if i > 0:
+                x = F.linear(h, input_weights[i])
+            x = x + recurrent[:, self._head_slices[i]]
+            h, _ = layer._update(*x.chunk(layer._num_heads, 1), ts=timespans)
+            new_h_state[:, self._state_slices[i]] = h
+        return h, new_h_state
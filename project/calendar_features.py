@@ -0,0 +1,148 @@
+"""Calendar features of the hours, computed in Python instead of by the R analysis.
+
+WorkDay, LastDayWasHolodiayAndNotWeekend and NextDayIsHolidayAndNotWeekend
+are defined as in analysis/analysis.Rmd, from the US public holidays that
+analysis/R/load_holidays.R retrieves. Instead of an API, the holidays follow
+the federal rules (with the observed day of holidays on a weekend); Columbus
+Day is left out, as the R analysis only keeps the holidays of all states.
+
+All flags of a day are packed into one byte of a per-day table covering
+whole years, which is cached on disk. Hours are mapped to their day by
+integer division of their time-step, i.e. the features of N hours are
+gathered by one indexing operation, without parsing any dates.
+"""
+import os
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+
+# bits of the per-day flags
+HOLIDAY = 1
+WEEKEND = 2
+WORKDAY = 4
+LAST_DAY_HOLIDAY_NOT_WEEKEND = 8
+NEXT_DAY_HOLIDAY_NOT_WEEKEND = 16
+
+CALENDAR_FEATURES: Dict[str, int] = {
+    "WorkDay": WORKDAY,
+    "LastDayWasHolodiayAndNotWeekend": LAST_DAY_HOLIDAY_NOT_WEEKEND,
+    "NextDayIsHolidayAndNotWeekend": NEXT_DAY_HOLIDAY_NOT_WEEKEND,
+}
+
+# version of the table layout and the holiday rules, part of the cache file names
+_VERSION = 1
+_EPOCH = date(1970, 1, 1)
+
+
+def _nth_weekday(year: int, month: int, weekday: int, n: int) -> date:
+    """n-th (from 1, or -1 for the last) weekday (Monday = 0) of the month"""
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _observed(day: date) -> date:
+    # holidays on a Saturday are observed on the Friday before, on a Sunday on the Monday after
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+def us_holidays(year: int) -> List[date]:
+    """Observed days of the US federal holidays (without Columbus Day) of a year."""
+    fixed = [date(year, 1, 1), date(year, 7, 4), date(year, 11, 11), date(year, 12, 25)]
+    if year >= 2021:
+        fixed.append(date(year, 6, 19))  # Juneteenth
+    return sorted([_observed(day) for day in fixed] + [
+        _nth_weekday(year, 1, 0, 3),  # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),  # Washington's Birthday
+        _nth_weekday(year, 5, 0, -1),  # Memorial Day
+        _nth_weekday(year, 9, 0, 1),  # Labor Day
+        _nth_weekday(year, 11, 3, 4),  # Thanksgiving Day
+    ])
+
+
+def _day_number(day: date) -> int:
+    return (day - _EPOCH).days
+
+
+def _build_table(first_year: int, last_year: int) -> ndarray:
+    first_day = _day_number(date(first_year, 1, 1))
+    num_days = _day_number(date(last_year + 1, 1, 1)) - first_day
+    # one extra day on both ends for the flags of the previous and the next day
+    holiday = np.zeros(num_days + 2, dtype=bool)
+    for year in range(first_year - 1, last_year + 2):
+        for day in us_holidays(year):
+            index = _day_number(day) - first_day + 1
+            if 0 <= index < len(holiday):
+                holiday[index] = True
+    # 1970-01-01 was a Thursday, i.e. Monday = 0 as for `date.weekday`
+    weekday = (np.arange(first_day - 1, first_day + num_days + 1) + 3) % 7
+    weekend = weekday >= 5
+
+    flags = np.zeros(num_days, dtype=np.uint8)
+    day, last_day, next_day = slice(1, -1), slice(None, -2), slice(2, None)
+    flags[holiday[day]] |= HOLIDAY
+    flags[weekend[day]] |= WEEKEND
+    flags[~(holiday[day] | weekend[day])] |= WORKDAY
+    flags[holiday[last_day] & ~weekend[day]] |= LAST_DAY_HOLIDAY_NOT_WEEKEND
+    flags[holiday[next_day] & ~weekend[next_day]] |= NEXT_DAY_HOLIDAY_NOT_WEEKEND
+    return flags
+
+
+def day_flags(first_year: int, last_year: int, cache_dir: Optional[str] = None) -> Tuple[int, ndarray]:
+    """Returns the flags of all days of the years.
+
+    Args:
+        first_year (int): first year of the table.
+        last_year (int): last year of the table, inclusive.
+        cache_dir (str, optional): directory the table is cached in. Defaults to None (no caching).
+
+    Returns:
+        Tuple[int, ndarray]: number of the first day (since 1970-01-01) and the uint8 flags of the days.
+    """
+    first_day = _day_number(date(first_year, 1, 1))
+    if cache_dir is None:
+        return first_day, _build_table(first_year, last_year)
+    path = os.path.join(cache_dir, f"calendar-v{_VERSION}-{first_year}-{last_year}.npy")
+    if not os.path.exists(path):
+        os.makedirs(cache_dir, exist_ok=True)
+        # written under a temporary name, such that concurrent readers never see a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, _build_table(first_year, last_year))
+        os.replace(tmp_path, path)
+    return first_day, np.load(path)
+
+
+def calendar_matrix(
+        days: ndarray,
+        features: Sequence[str] = tuple(CALENDAR_FEATURES),
+        cache_dir: Optional[str] = None) -> ndarray:
+    """Computes the calendar features of rows, e.g. hours of one or many stations.
+
+    Args:
+        days (ndarray): day of every row, counted from 1970-01-01, e.g. `step_index(index) // 24`.
+        features (Sequence[str], optional): F names of CALENDAR_FEATURES. Defaults to all of them.
+        cache_dir (str, optional): directory the per-day table is cached in. Defaults to None (no caching).
+
+    Returns:
+        ndarray: float32 array of shape (N, F), 1.0 where the feature is true, else 0.0.
+    """
+    days = np.asarray(days, dtype=np.int64)
+    out = np.empty((len(days), len(features)), dtype=np.float32)
+    if len(days) == 0:
+        return out
+    first_year = (_EPOCH + timedelta(days=int(days.min()))).year
+    last_year = (_EPOCH + timedelta(days=int(days.max()))).year
+    first_day, flags = day_flags(first_year, last_year, cache_dir)
+    row_flags = flags[days - first_day]
+    for i, feature in enumerate(features):
+        np.not_equal(row_flags & CALENDAR_FEATURES[feature], 0, out=out[:, i], casting="unsafe")
+    return out
@@ -0,0 +1,116 @@
+from typing import Optional, Tuple, Union
+
+import numpy as np
+import torch
+from torch import Tensor
+from torch.utils.data import Dataset
+from numpy import ndarray
+
+
+class SlidingWindowDataset(Dataset):
+    """Overlapping windows of a time-series, used for mini-batch training.
+
+    The windows are strided views of the underlying series, i.e. no data
+    is copied until the DataLoader collates a batch of windows into a
+    (B, L, F) tensor.
+    """
+    def __init__(
+            self,
+            x: Union[ndarray, Tensor],
+            y: Union[ndarray, Tensor],
+            window_size: int,
+            stride: int = 1) -> None:
+        """
+        Args:
+            x (Union[ndarray, Tensor]): features of shape (N, F).
+            y (Union[ndarray, Tensor]): targets of shape (N, 1).
+            window_size (int): number of time-steps L of each window.
+            stride (int, optional): number of time-steps between the starts of consecutive windows. Defaults to 1.
+        """
+        x = torch.as_tensor(x, dtype=torch.float32)
+        y = torch.as_tensor(y, dtype=torch.float32)
+        if len(x) != len(y):
+            raise ValueError(f"x and y differ in length ({len(x)} != {len(y)})")
+        if window_size < 1 or window_size > len(x):
+            raise ValueError(
+                f"Invalid window_size {window_size}, expected a value between 1 and {len(x)}"
+            )
+        if stride < 1:
+            raise ValueError(f"Invalid stride {stride}, expected a positive integer")
+        self.window_size = window_size
+        self.stride = stride
+        # unfold returns a (num_windows, F, L) view of the series
+        self.x = x.unfold(0, window_size, stride).transpose(1, 2)
+        self.y = y.unfold(0, window_size, stride).transpose(1, 2)
+
+    def __len__(self) -> int:
+        return len(self.x)
+
+    def __getitem__(self, idx: int) -> Tuple[Tensor, Tensor]:
+        return self.x[idx], self.y[idx]
+
+
+class MemmapDataset(Dataset):
+    """Time-steps, or windows of time-steps, of float32 .npy files, e.g. the ones of the FeatureStore.
+
+    The files are memory-mapped and every item is a tensor view of the mapped
+    pages, i.e. no data is copied until the DataLoader collates a batch. Only
+    the paths are pickled into the DataLoader workers, each worker maps the
+    files itself, such that all processes share the pages of the page cache
+    instead of holding a copy of the data each.
+    """
+    def __init__(
+            self,
+            x_path: str,
+            y_path: str,
+            window_size: Optional[int] = None,
+            stride: int = 1) -> None:
+        """
+        Args:
+            x_path (str): .npy file of the features, of shape (N, F).
+            y_path (str): .npy file of the targets, of shape (N, 1).
+            window_size (int, optional): number of time-steps L of each item. Defaults to None, i.e.
+                single time-steps of shape (F,), as by a TensorDataset.
+            stride (int, optional): number of time-steps between the starts of consecutive windows. Defaults to 1.
+        """
+        self.x_path = x_path
+        self.y_path = y_path
+        self.window_size = window_size
+        self.stride = stride
+        self._x, self._y = None, None
+        x, y = self._arrays()
+        if len(x) != len(y):
+            raise ValueError(f"x and y differ in length ({len(x)} != {len(y)})")
+        if window_size is not None and (window_size < 1 or window_size > len(x)):
+            raise ValueError(
+                f"Invalid window_size {window_size}, expected a value between 1 and {len(x)}"
+            )
+        if stride < 1:
+            raise ValueError(f"Invalid stride {stride}, expected a positive integer")
+        self._len = len(x) if window_size is None else (len(x) - window_size) // stride + 1
+
+    def _arrays(self) -> Tuple[ndarray, ndarray]:
+        if self._x is None:
+            # copy-on-write, the mapping is writable (as torch expects), but the files are never changed
+            self._x = np.load(self.x_path, mmap_mode="c")
+            self._y = np.load(self.y_path, mmap_mode="c")
+        return self._x, self._y
+
+    def __getstate__(self) -> dict:
+        # the workers map the files themselves
+        return {**self.__dict__, "_x": None, "_y": None}
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __getitem__(self, idx: int) -> Tuple[Tensor, Tensor]:
+        x, y = self._arrays()
+        if idx < 0:
+            idx += self._len
+        if not 0 <= idx < self._len:
+            raise IndexError(f"Index {idx} is out of range for a dataset of length {self._len}")
+        if self.window_size is None:
+            return torch.from_numpy(x[idx]), torch.from_numpy(y[idx])
+        start = idx * self.stride
+        window = slice(start, start + self.window_size)
+        return torch.from_numpy(x[window]), torch.from_numpy(y[window])
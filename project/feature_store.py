@@ -0,0 +1,186 @@
+"""On-disk store of the preprocessed training arrays.
+
+Reading and preprocessing the raw data (`prepare_data`, `make_features`,
+`generate_train_data` and the scaling) is repeated by every training run,
+although its result only changes with the source file and the data related
+settings in Config. The store keeps the final float32 feature and target
+arrays as .npy files, together with the scaling statistics, in a directory
+per key. Loading them memory-maps the files, i.e. a warm start reads only
+the pages that are accessed.
+"""
+import os
+import json
+import shutil
+import struct
+import tempfile
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+from project.results import result_key
+
+
+def source_fingerprint(path: str) -> dict:
+    """Identifies the version of a source file by its path, size and modification time,
+    without reading the file."""
+    stat = os.stat(path)
+    return {"path": os.path.abspath(path), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class FeatureStore:
+    """Directory of preprocessed (x, y) arrays, one subdirectory per key holding
+    x.npy, y.npy and the metadata in meta.json."""
+    def __init__(self, root: str) -> None:
+        """
+        Args:
+            root (str): directory of the store, created if it does not exist.
+        """
+        os.makedirs(root, exist_ok=True)
+        self.root = root
+
+    @staticmethod
+    def key(**params) -> str:
+        """Key of the arrays computed with the given (JSON serializable) parameters, see `result_key`."""
+        return result_key(**params)
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def load(self, key: str) -> Optional[Tuple[ndarray, ndarray, dict]]:
+        """Memory-maps the arrays stored under the key.
+
+        The arrays are mapped copy-on-write, i.e. they are writable, but changes
+        are neither written back to the files nor visible to other processes.
+
+        Returns:
+            Optional[Tuple[ndarray, ndarray, dict]]: x, y and the metadata, None if the key is unknown.
+        """
+        path = self.path(key)
+        if not os.path.exists(os.path.join(path, "meta.json")):
+            return None
+        with open(os.path.join(path, "meta.json")) as file:
+            meta = json.load(file)
+        x = np.load(os.path.join(path, "x.npy"), mmap_mode="c")
+        y = np.load(os.path.join(path, "y.npy"), mmap_mode="c")
+        return x, y, meta
+
+    def save(self, key: str, x: ndarray, y: ndarray, meta: Optional[dict] = None) -> None:
+        """Stores x and y as float32 arrays, replacing the arrays stored under the key.
+
+        The files are written to a temporary directory that is renamed at the
+        end, so an interrupted run never leaves an incomplete entry behind.
+        """
+        tmp_path = tempfile.mkdtemp(dir=self.root)
+        try:
+            np.save(os.path.join(tmp_path, "x.npy"), np.asarray(x, dtype=np.float32))
+            np.save(os.path.join(tmp_path, "y.npy"), np.asarray(y, dtype=np.float32))
+            # meta.json marks the entry as complete, see `load`
+            with open(os.path.join(tmp_path, "meta.json"), "w") as file:
+                json.dump(meta or {}, file)
+            shutil.rmtree(self.path(key), ignore_errors=True)
+            os.replace(tmp_path, self.path(key))
+        except BaseException:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+
+    def writer(self, key: str) -> "FeatureWriter":
+        """Returns a writer that stores x and y under the key chunk by chunk, see `FeatureWriter`."""
+        return FeatureWriter(self, key)
+
+
+def _npy_header(shape: Tuple[int, ...], dtype: np.dtype, length: Optional[int] = None) -> bytes:
+    """Header of a version 1.0 .npy file, padded with spaces to `length` bytes (default: a multiple of 64)."""
+    header = repr({"descr": np.lib.format.dtype_to_descr(dtype), "fortran_order": False, "shape": shape})
+    # magic string, version and header length take 10 bytes, the header ends with a newline
+    size = 10 + len(header) + 1
+    length = length or -(-size // 64) * 64
+    header += " " * (length - size) + "\n"
+    return np.lib.format.magic(1, 0) + struct.pack("<H", len(header)) + header.encode("latin1")
+
+
+class FeatureWriter:
+    """Writes the x and y arrays of a FeatureStore entry chunk by chunk, such
+    that only one chunk has to be held in memory.
+
+    The rows are appended to .npy files in a temporary directory, whose
+    headers get the final number of rows once all rows are written. Usage:
+
+        with store.writer(key) as writer:
+            for x, y in chunks:
+                writer.append(x, y)
+            x, y = writer.arrays()  # optional, e.g. to scale them in place
+            writer.commit(meta)
+
+    The entry only becomes visible by `commit`, leaving the `with` block
+    without it discards the written rows.
+    """
+    def __init__(self, store: FeatureStore, key: str) -> None:
+        self.store = store
+        self.key = key
+        self._tmp_path = tempfile.mkdtemp(dir=store.root)
+        self._files: Dict[str, object] = {}
+        self._widths: Dict[str, int] = {}
+        self._rows = 0
+        # length of the headers, reserved for the largest possible number of rows
+        self._header_lengths: Dict[str, int] = {}
+
+    def append(self, x: ndarray, y: ndarray) -> None:
+        """Appends rows of shape (N, F) and (N, 1), stored as float32."""
+        if len(x) != len(y):
+            raise ValueError(f"x and y differ in length ({len(x)} != {len(y)})")
+        for name, array in [("x", x), ("y", y)]:
+            array = np.ascontiguousarray(array, dtype=np.float32)
+            if name not in self._files:
+                self._widths[name] = array.shape[1]
+                self._files[name] = open(os.path.join(self._tmp_path, f"{name}.npy"), "wb")
+                header = _npy_header((2 ** 63 - 1, array.shape[1]), array.dtype)
+                self._header_lengths[name] = len(header)
+                self._files[name].write(header)
+            elif array.shape[1] != self._widths[name]:
+                raise ValueError(f"Expected {self._widths[name]} columns of {name}, got {array.shape[1]}")
+            self._files[name].write(array.tobytes())
+        self._rows += len(x)
+
+    def arrays(self) -> Tuple[ndarray, ndarray]:
+        """Completes the files and memory-maps them writable, e.g. to scale them in place before `commit`.
+
+        Returns:
+            Tuple[ndarray, ndarray]: x and y of all appended rows.
+        """
+        if not self._files:
+            raise ValueError("No rows were appended")
+        for name, file in self._files.items():
+            if not file.closed:
+                file.seek(0)
+                file.write(_npy_header((self._rows, self._widths[name]), np.dtype(np.float32), self._header_lengths[name]))
+                file.close()
+        return tuple(
+            np.load(os.path.join(self._tmp_path, f"{name}.npy"), mmap_mode="r+") for name in ["x", "y"]
+        )
+
+    def commit(self, meta: Optional[dict] = None) -> None:
+        """Makes the written arrays the entry of the key, replacing the one stored before."""
+        x, y = self.arrays()
+        x.flush()
+        y.flush()
+        del x, y
+        with open(os.path.join(self._tmp_path, "meta.json"), "w") as file:
+            json.dump(meta or {}, file)
+        shutil.rmtree(self.store.path(self.key), ignore_errors=True)
+        os.replace(self._tmp_path, self.store.path(self.key))
+        self._tmp_path = None
+
+    def abort(self) -> None:
+        """Discards the written rows."""
+        for file in self._files.values():
+            file.close()
+        if self._tmp_path is not None:
+            shutil.rmtree(self._tmp_path, ignore_errors=True)
+            self._tmp_path = None
+
+    def __enter__(self) -> "FeatureWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.abort()
@@ -0,0 +1,89 @@
+"""Lagged values of time-series, aligned by their timestamps instead of their positions.
+
+The series are placed on a regular grid of time-steps, in which missing
+time-steps stay NaN. A lag of k steps is then a fixed offset into the grid,
+such that all (column, lag) pairs of all rows are gathered by one vectorised
+indexing operation, and a gap in the data shows up as a masked value
+instead of shifting all following values.
+"""
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+from numpy import ndarray
+from pandas import DatetimeIndex
+
+
+def step_index(index: DatetimeIndex, values_per_day: int = 24) -> ndarray:
+    """Number of the time-step of every timestamp, counted from the epoch.
+
+    Args:
+        index (DatetimeIndex): timestamps, on the grid of `values_per_day` steps per day.
+        values_per_day (int, optional): number of time-steps per day. Defaults to 24 (hourly).
+
+    Returns:
+        ndarray: int64 array of the time-steps.
+    """
+    seconds = index.values.astype("datetime64[s]").astype(np.int64)
+    return seconds // (24 * 60 * 60 // values_per_day)
+
+
+def regular_grid(steps: ndarray, values: ndarray) -> Tuple[int, ndarray]:
+    """Places the rows of `values` at their time-steps on a regular grid.
+
+    Args:
+        steps (ndarray): unique time-steps of the N rows, see `step_index`, need not be sorted.
+        values (ndarray): values of shape (N, C).
+
+    Returns:
+        Tuple[int, ndarray]: the first time-step and the float32 grid of shape (T, C)
+            from the first to the last time-step, NaN at the missing time-steps.
+    """
+    start = int(steps.min())
+    grid = np.full((int(steps.max()) - start + 1, values.shape[1]), np.nan, dtype=np.float32)
+    grid[steps - start] = values
+    return start, grid
+
+
+def lag_matrix(
+        steps: ndarray,
+        values: ndarray,
+        lags: Sequence[Tuple[int, int]],
+        out: Optional[ndarray] = None) -> Tuple[ndarray, ndarray]:
+    """Gathers the lagged values of the columns of `values`.
+
+    Example: the values of one day and one week before for the stations in the
+    columns of a (N, S) array are gathered by
+    `lag_matrix(steps, values, [(s, lag) for s in range(S) for lag in [24, 168]])`.
+
+    Args:
+        steps (ndarray): unique time-steps of the N rows, see `step_index`, need not be sorted.
+        values (ndarray): values of shape (N, C) or (N,), NaN where a column has no value.
+        lags (Sequence[Tuple[int, int]]): P pairs (column, lag), the lag in time-steps, 0 for the value itself.
+        out (ndarray, optional): float32 array of shape (N, P) to write the lagged values to. Defaults to None (a new array).
+
+    Returns:
+        Tuple[ndarray, ndarray]: the (N, P) float32 lagged values, NaN where they are missing,
+            and the (N, P) mask of the values that are present.
+    """
+    values = np.asarray(values, dtype=np.float32)
+    if values.ndim == 1:
+        values = values[:, None]
+    steps = np.asarray(steps, dtype=np.int64)
+    if len(steps) != len(values):
+        raise ValueError(f"steps and values differ in length ({len(steps)} != {len(values)})")
+    columns = np.array([column for column, _ in lags], dtype=np.int64)
+    shifts = np.array([lag for _, lag in lags], dtype=np.int64)
+    if out is None:
+        out = np.empty((len(steps), len(lags)), dtype=np.float32)
+    if len(steps) == 0:
+        return out, np.zeros(out.shape, dtype=bool)
+
+    start, grid = regular_grid(steps, values)
+    num_steps = len(grid)
+
+    rows = steps[:, None] - start - shifts[None, :]
+    valid = (rows >= 0) & (rows < num_steps)
+    flat = np.where(valid, rows, 0) * values.shape[1] + columns[None, :]
+    np.take(grid.ravel(), flat, out=out)
+    out[~valid] = np.nan
+    return out, ~np.isnan(out)
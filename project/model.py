@@ -1,7 +1,22 @@
+import torch
 import torch.optim as optim
 
 import pytorch_lightning as pl
-from torchmetrics import MeanAbsolutePercentageError
+
+
+def mape(y_hat, y, epsilon=1.17e-06):
+    """Mean absolute percentage error, same as torchmetrics' `MeanAbsolutePercentageError`
+    but without instantiating (and moving to the device) a metric object for every batch.
+
+    Args:
+        y_hat (Tensor): predicted values.
+        y (Tensor): true values.
+        epsilon (float, optional): lower bound of abs(y), avoids dividing by zero. Defaults to 1.17e-06.
+
+    Returns:
+        Tensor: scalar loss.
+    """
+    return torch.mean(torch.abs(y_hat - y) / torch.clamp(torch.abs(y), min=epsilon))
 
 class SequenceLearner(pl.LightningModule):
     """Class wrapper for training the models efficiently.
@@ -9,43 +24,123 @@ class SequenceLearner(pl.LightningModule):
 
     If you want to save the model itself into checkpoint,
     use `self.save_hyperparameters()`.
+
+    Batches of shape (L, F) are treated as one sequence. Batches of
+    shape (B, L, F), e.g. from `SlidingWindowDataset`, are fed as B
+    sequences at once, and the loss is computed on their last
+    L - burn_in steps only, giving the model `burn_in` steps to warm up
+    its hidden state.
+
+    With `stateful=True` the (detached) hidden state at the end of a
+    training batch is the initial state of the next one, which requires
+    consecutive batches to be contiguous in time (shuffle=False). The
+    state is reset at the start of every epoch. With `tbptt_steps` each
+    training batch is split into chunks of that many time-steps, with one
+    optimizer step per chunk (truncated backpropagation through time).
+    As the optimization is done manually in that case, the gradients are
+    clipped by the learner to `gradient_clip_val` instead of the Trainer.
+
+    The training loss is logged per step as `train_loss_step` and as the
+    mean over the batches of the epoch as `train_loss_epoch`. The latter is
+    what the checkpoints are selected by, the same quantity as the
+    `best_model_score` of FastTrainer and EnsembleTrainer.
     """
-    def __init__(self, model, lr=0.005, features_num=3, device="cuda"):
+    def __init__(
+            self, model, lr=0.005, features_num=3, device="cuda", burn_in=0,
+            stateful=False, tbptt_steps=None, gradient_clip_val=None):
         super().__init__()
         self.save_hyperparameters(ignore=['model'])
         self.model = model
         self.features_num = features_num
         self.mydevice = device
         self.lr = lr
+        self.burn_in = burn_in
+        self.stateful = stateful
+        self.tbptt_steps = tbptt_steps
+        self.gradient_clip_val = gradient_clip_val
+        # one optimizer step per chunk cannot be done by Lightning's automatic optimization
+        self.automatic_optimization = tbptt_steps is None
+        self._hx = None
+
+    @staticmethod
+    def _detach_state(hx):
+        # the state is carried over, but the gradients are truncated
+        if isinstance(hx, tuple):
+            return tuple(h.detach() for h in hx)
+        return hx.detach()
+
+    def on_train_epoch_start(self):
+        # every epoch starts over at the beginning of the series
+        self._hx = None
+
+    def _reshape_batch(self, x, y):
+        if x.dim() == 3:
+            # Batch of windows, the first steps only warm up the hidden state
+            return x, y, self.burn_in
+        return x.view((1, -1, self.features_num)), y.view((1, -1, 1)), 0
 
     def training_step(self, batch, batch_idx):
         x, y = batch
         x = x.to(self.mydevice)
         y = y.to(self.mydevice)
-        x = x.view((1, -1, self.features_num))
-        y = y.view((1, -1, 1))
-        
-        mape = MeanAbsolutePercentageError().to(self.mydevice)
+        x, y, burn_in = self._reshape_batch(x, y)
         
-        y_hat, _ = self.model.forward(x)
+        if self.tbptt_steps is not None:
+            loss = self._truncated_bptt_step(x, y, burn_in)
+            self._log_train_loss(loss)
+            return {"loss": loss}
+
+        y_hat, hx = self.model.forward(x, self._hx if self.stateful else None)
+        if self.stateful:
+            self._hx = self._detach_state(hx)
         y_hat = y_hat.view_as(y)
-        loss = mape(y_hat, y)
+        loss = mape(y_hat[:, burn_in:], y[:, burn_in:])
 
-        self.log("train_loss", loss, prog_bar=True)
+        self._log_train_loss(loss)
         return {"loss": loss}
 
+    def _log_train_loss(self, loss):
+        # batch_size=1 makes the epoch value the plain mean over the batches, as
+        # in FastTrainer, instead of weighting them by their (inferred) size
+        self.log("train_loss", loss, prog_bar=True, on_step=True, on_epoch=True, batch_size=1)
+
+    def _truncated_bptt_step(self, x, y, burn_in):
+        """Runs the batch in chunks of `tbptt_steps` time-steps with an optimizer step each.
+
+        Returns:
+            Tensor: mean loss of the chunks.
+        """
+        optimizer = self.optimizers()
+        hx = self._hx if self.stateful else None
+        losses = []
+        for start in range(0, x.size(1), self.tbptt_steps):
+            chunk = slice(start, start + self.tbptt_steps)
+            y_hat, hx = self.model.forward(x[:, chunk], hx)
+            y_hat = y_hat.view_as(y[:, chunk])
+            # the burn-in counts from the start of the batch
+            skip = max(burn_in - start, 0)
+            if skip < y_hat.size(1):
+                loss = mape(y_hat[:, skip:], y[:, chunk][:, skip:])
+                optimizer.zero_grad()
+                self.manual_backward(loss)
+                if self.gradient_clip_val is not None:
+                    self.clip_gradients(optimizer, gradient_clip_val=self.gradient_clip_val)
+                optimizer.step()
+                losses.append(loss.detach())
+            hx = self._detach_state(hx)
+        if self.stateful:
+            self._hx = hx
+        return torch.stack(losses).mean()
+
     def validation_step(self, batch, batch_idx):
         x, y = batch
         x = x.to(self.mydevice)
         y = y.to(self.mydevice)
-        x = x.view((1, -1, self.features_num))
-        y = y.view((1, -1, 1))
-        
-        mape_loss = MeanAbsolutePercentageError().to(self.mydevice)
+        x, y, burn_in = self._reshape_batch(x, y)
         
         y_hat, _ = self.model.forward(x)
         y_hat = y_hat.view_as(y)
-        loss = mape_loss(y_hat, y)
+        loss = mape(y_hat[:, burn_in:], y[:, burn_in:])
 
         self.log("val_loss", loss, prog_bar=True)
         return loss
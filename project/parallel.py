@@ -0,0 +1,111 @@
+"""Process-pool execution of independent training runs, e.g. the combinations of a grid search.
+
+Every worker is pinned to its own set of cores and limits torch to as many
+threads, such that the workers do not compete for the cores. Arrays that
+all runs need (the preprocessed training data) are placed once in shared
+memory instead of being pickled into every task.
+"""
+import os
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing.shared_memory import SharedMemory
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import torch
+from numpy import ndarray
+
+
+# Arrays attached by this worker process, name -> (shared memory, array)
+_attached = {}
+
+
+def cpu_sets(num_workers: int, cpus: Optional[List[int]] = None) -> List[List[int]]:
+    """Splits the available cpus into `num_workers` disjoint, contiguous sets.
+
+    Args:
+        num_workers (int): number of sets.
+        cpus (List[int], optional): cpus to split. Defaults to the cpus this process may run on.
+
+    Returns:
+        List[List[int]]: cpus of every worker, the first sets get one more cpu if they do not divide evenly.
+    """
+    if cpus is None:
+        cpus = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else list(range(os.cpu_count()))
+    if num_workers > len(cpus):
+        # more workers than cpus, some of them have to share a cpu
+        return [[cpus[i % len(cpus)]] for i in range(num_workers)]
+    return [part.tolist() for part in np.array_split(np.array(cpus), num_workers)]
+
+
+def _share(arrays: Dict[str, ndarray]) -> Tuple[List[SharedMemory], Dict[str, tuple]]:
+    handles, descriptors = [], {}
+    for key, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+        np.ndarray(array.shape, array.dtype, buffer=shm.buf)[...] = array
+        handles.append(shm)
+        descriptors[key] = (shm.name, array.shape, array.dtype.str)
+    return handles, descriptors
+
+
+def _attach(descriptors: Dict[str, tuple]) -> Dict[str, ndarray]:
+    arrays = {}
+    for key, (name, shape, dtype) in descriptors.items():
+        if name not in _attached:
+            shm = SharedMemory(name=name)
+            _attached[name] = (shm, np.ndarray(shape, np.dtype(dtype), buffer=shm.buf))
+        arrays[key] = _attached[name][1]
+    return arrays
+
+
+def _init_worker(cpu_queue) -> None:
+    cpus = cpu_queue.get()
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpus)
+    torch.set_num_threads(len(cpus))
+
+
+def _run(fn: Callable, descriptors: Dict[str, tuple], args: tuple):
+    return fn(*args, **_attach(descriptors))
+
+
+def run_parallel(
+        fn: Callable,
+        tasks: List[tuple],
+        arrays: Dict[str, ndarray],
+        num_workers: int) -> Iterator[Tuple[tuple, object]]:
+    """Runs `fn(*task, **arrays)` for every task in a pool of `num_workers` processes.
+
+    The workers are started with the spawn method and pinned to the
+    disjoint cpu sets of `cpu_sets(num_workers)`. `fn` has to be a
+    module-level (picklable) function and must not modify the arrays.
+
+    Args:
+        fn (Callable): function to run, receives the arrays as keyword arguments.
+        tasks (List[tuple]): positional arguments of every call.
+        arrays (Dict[str, ndarray]): arrays shared by all calls, passed through shared memory.
+        num_workers (int): number of processes.
+
+    Yields:
+        Tuple[tuple, object]: task and result of every call, in the order the calls finish.
+    """
+    context = mp.get_context("spawn")
+    cpu_queue = context.Queue()
+    for cpus in cpu_sets(num_workers):
+        cpu_queue.put(cpus)
+    handles, descriptors = _share(arrays)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(cpu_queue,),
+        ) as executor:
+            futures = {executor.submit(_run, fn, descriptors, task): task for task in tasks}
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+    finally:
+        for shm in handles:
+            shm.close()
+            shm.unlink()
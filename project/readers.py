@@ -0,0 +1,98 @@
+"""Readers of the raw time-series that only read what the training needs.
+
+Parquet files are read with the column projection and the datetime range
+pushed down into the parquet reader, such that row groups outside of the
+range and the columns of the other stations are skipped. Files larger than
+the memory can be processed batch by batch with `iter_parquet`.
+"""
+import os
+import operator
+from datetime import datetime, timedelta
+from typing import Iterator, List, Optional
+
+import pandas as pd
+import pyarrow.dataset as ds
+from pandas import DataFrame
+
+
+def history_start(dt_from: str, days: int) -> str:
+    """Returns the point of time `days` before `dt_from` (in the ISO-format of Config)."""
+    return (datetime.fromisoformat(dt_from) - timedelta(days=days)).isoformat().replace('T', ' ')
+
+
+def _scan(
+        path: str,
+        columns: Optional[List[str]],
+        dt_from: Optional[str],
+        dt_till: Optional[str],
+        datetime_column: str,
+        **kwargs) -> ds.Scanner:
+    dataset = ds.dataset(path, format="parquet")
+    # the filter values have to match the timezone of the datetime column
+    tz = getattr(dataset.schema.field(datetime_column).type, "tz", None)
+    condition = None
+    for dt, compare in [(dt_from, operator.ge), (dt_till, operator.lt)]:
+        if dt:
+            timestamp = pd.Timestamp(dt)
+            if tz is not None and timestamp.tz is None:
+                timestamp = timestamp.tz_localize(tz)
+            bound = compare(ds.field(datetime_column), timestamp)
+            condition = bound if condition is None else condition & bound
+    return dataset.scanner(columns=columns, filter=condition, **kwargs)
+
+
+def read_parquet(
+        path: str,
+        columns: Optional[List[str]] = None,
+        dt_from: Optional[str] = None,
+        dt_till: Optional[str] = None,
+        datetime_column: str = "Datetime") -> DataFrame:
+    """Reads the columns of the rows with dt_from <= datetime < dt_till from a parquet file.
+
+    Args:
+        path (str): path of the parquet file.
+        columns (List[str], optional): columns to read, e.g. the datetime, the station and the features. Defaults to None (all).
+        dt_from (str, optional): first point of time to read. Defaults to None (from the start).
+        dt_till (str, optional): point of time to read until, exclusive. Defaults to None (until the end).
+        datetime_column (str, optional): name of the datetime column. Defaults to "Datetime".
+
+    Returns:
+        DataFrame: the rows in the order of the file, the datetime column becomes the index if it is the index of the file.
+    """
+    return _scan(path, columns, dt_from, dt_till, datetime_column).to_table().to_pandas()
+
+
+def iter_parquet(
+        path: str,
+        columns: Optional[List[str]] = None,
+        dt_from: Optional[str] = None,
+        dt_till: Optional[str] = None,
+        datetime_column: str = "Datetime",
+        batch_size: int = 2 ** 16) -> Iterator[DataFrame]:
+    """Same as `read_parquet`, but yields the rows in DataFrames of at most `batch_size` rows,
+    such that only one batch is held in memory at a time.
+    """
+    scanner = _scan(path, columns, dt_from, dt_till, datetime_column, batch_size=batch_size)
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield batch.to_pandas()
+
+
+def iter_chunks(
+        path: str,
+        columns: Optional[List[str]] = None,
+        dt_from: Optional[str] = None,
+        dt_till: Optional[str] = None,
+        chunk_size: int = 2 ** 16) -> Iterator[DataFrame]:
+    """Yields the columns of a parquet or csv file in DataFrames of at most `chunk_size` rows.
+
+    The datetime range dt_from <= Datetime < dt_till is only applied to parquet
+    files (see `iter_parquet`), the chunks of csv files hold all rows.
+    """
+    _, ext = os.path.splitext(path)
+    if ext == ".parquet":
+        yield from iter_parquet(path, columns=columns, dt_from=dt_from, dt_till=dt_till, batch_size=chunk_size)
+    elif ext == ".csv":
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+    else:
+        raise ValueError("File extension is not supported")
@@ -0,0 +1,100 @@
+"""Persistent store of the trained grid search combinations.
+
+Every trained model is recorded in an SQLite database under a key that
+hashes everything its result depends on: the training arrays, the feature
+list, the wiring seed and the hyperparameters. A grid search asks the store
+before training a combination, such that re-running an unchanged or an
+interrupted search only trains what is missing, and selects the best model
+by a query instead of by scanning the checkpoint filenames.
+"""
+import os
+import json
+import hashlib
+import sqlite3
+from datetime import datetime
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+
+def data_fingerprint(*arrays: ndarray) -> str:
+    """Hashes the shape, dtype and content of the arrays.
+
+    Returns:
+        str: hex digest, identical for equal arrays.
+    """
+    digest = hashlib.sha256()
+    for array in arrays:
+        array = np.ascontiguousarray(array)
+        digest.update(f"{array.shape}{array.dtype.str}".encode())
+        digest.update(memoryview(array).cast("B"))
+    return digest.hexdigest()
+
+
+def result_key(**params) -> str:
+    """Hashes the (JSON serializable) parameters of a training run, independent of their order."""
+    return hashlib.sha256(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+class ResultsStore:
+    """SQLite table of the trained models, one row per `result_key`."""
+    def __init__(self, path: str) -> None:
+        """
+        Args:
+            path (str): path of the database file, created if it does not exist.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self._connection = sqlite3.connect(path)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results ("
+                "key TEXT PRIMARY KEY, "
+                "params TEXT NOT NULL, "
+                "model_path TEXT NOT NULL, "
+                "train_loss REAL NOT NULL, "
+                "created TEXT NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[Tuple[str, float]]:
+        """Returns the checkpoint path and training loss stored under the key.
+
+        Returns None if the key is unknown or its checkpoint was deleted since.
+        """
+        row = self._connection.execute(
+            "SELECT model_path, train_loss FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or not os.path.exists(row[0]):
+            return None
+        return row
+
+    def put(self, key: str, params: dict, model_path: str, train_loss: float) -> None:
+        """Records a trained model, replacing an older record of the same key."""
+        with self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                (key, json.dumps(params, sort_keys=True), model_path, float(train_loss), datetime.now().isoformat())
+            )
+
+    def best(self, keys: Optional[Iterable[str]] = None) -> Optional[Tuple[str, float]]:
+        """Returns the checkpoint path and training loss of the model with the lowest training loss.
+
+        Args:
+            keys (Iterable[str], optional): keys to choose from, e.g. the ones of a grid search. Defaults to None (all).
+
+        Returns:
+            Optional[Tuple[str, float]]: None if there is no model (with an existing checkpoint) to choose from.
+        """
+        query = "SELECT model_path, train_loss FROM results"
+        args = ()
+        if keys is not None:
+            args = tuple(keys)
+            query += f" WHERE key IN ({', '.join('?' * len(args))})"
+        for row in self._connection.execute(query + " ORDER BY train_loss", args):
+            if os.path.exists(row[0]):
+                return row
+        return None
+
+    def close(self) -> None:
+        self._connection.close()
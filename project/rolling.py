@@ -0,0 +1,164 @@
+"""Rolling window statistics of the load, computed in Python instead of by the R analysis.
+
+The features are defined as in analysis/analysis.Rmd: a statistic over the
+values of a window of lags that ends 25 hours before the hour, e.g.
+MeanLastWeek is the mean of the values 25 to 191 hours before. As in the R
+analysis, the series are placed on a regular hourly grid and missing hours
+are filled with the last value before them.
+
+The means are differences of cumulative sums, the maxima and minima are
+computed with the van Herk/Gil-Werman algorithm (prefix and suffix extrema
+of blocks of the window length). Both take O(n) time for n hours,
+independent of the window length, and are vectorised over the stations.
+"""
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+from project.lags import regular_grid
+
+
+# name -> (statistic, first lag, last lag), the lags in hours, both inclusive
+ROLLING_FEATURES: Dict[str, Tuple[str, int, int]] = {
+    "MeanLastWeek": ("mean", 25, 24 * 8 - 1),
+    "MeanLastTwoDays": ("mean", 25, 24 * 3 - 1),
+    "MaxLastOneDay": ("max", 25, 24 * 2 - 1),
+    "MinLastOneDay": ("min", 25, 24 * 2 - 1),
+}
+
+
+def _fill_forward(grid: ndarray) -> ndarray:
+    """Replaces the NaNs of every column by the last value before them, leading NaNs stay."""
+    rows = np.where(np.isnan(grid), 0, np.arange(len(grid))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    return grid[rows, np.arange(grid.shape[1])[None, :]]
+
+
+def _window_mean(grid: ndarray, first: int, last: int) -> ndarray:
+    num_steps = len(grid)
+    out = np.full(grid.shape, np.nan, dtype=np.float32)
+    if num_steps <= last:
+        return out
+    missing = np.isnan(grid)
+    sums = np.zeros((num_steps + 1, grid.shape[1]))
+    np.cumsum(np.where(missing, 0.0, grid), axis=0, dtype=np.float64, out=sums[1:])
+    counts = np.zeros((num_steps + 1, grid.shape[1]), dtype=np.int64)
+    np.cumsum(missing, axis=0, out=counts[1:])
+    # the window of step t are the steps t - last to t - first
+    upper, lower = slice(last - first + 1, num_steps - first + 1), slice(0, num_steps - last)
+    out[last:] = (sums[upper] - sums[lower]) / (last - first + 1)
+    out[last:][counts[upper] > counts[lower]] = np.nan
+    return out
+
+
+def _window_extreme(grid: ndarray, first: int, last: int, extreme: np.ufunc) -> ndarray:
+    num_steps, num_columns = grid.shape
+    out = np.full(grid.shape, np.nan, dtype=np.float32)
+    if num_steps <= last:
+        return out
+    width = last - first + 1
+    num_blocks = -(-num_steps // width)
+    blocks = np.full((num_blocks * width, num_columns), np.nan, dtype=np.float32)
+    blocks[:num_steps] = grid
+    blocks = blocks.reshape(num_blocks, width, num_columns)
+    # a window of `width` steps covers the end of one block and the start of the next one
+    prefix = extreme.accumulate(blocks, axis=1).reshape(-1, num_columns)
+    suffix = extreme.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(-1, num_columns)
+    # NaNs propagate, i.e. a window containing a missing value is NaN
+    out[last:] = extreme(suffix[:num_steps - last], prefix[width - 1:width - 1 + num_steps - last])
+    return out
+
+
+def _rolling_grid(grid: ndarray, feature: str) -> ndarray:
+    statistic, first, last = ROLLING_FEATURES[feature]
+    if statistic == "mean":
+        return _window_mean(grid, first, last)
+    return _window_extreme(grid, first, last, np.maximum if statistic == "max" else np.minimum)
+
+
+def rolling_matrix(
+        steps: ndarray,
+        values: ndarray,
+        features: Sequence[str] = tuple(ROLLING_FEATURES)) -> ndarray:
+    """Computes the rolling features of the columns of `values`, e.g. of many stations.
+
+    Args:
+        steps (ndarray): unique hours of the N rows, see `project.lags.step_index`, need not be sorted.
+        values (ndarray): values of shape (N, S) or (N,), NaN where a column has no value.
+        features (Sequence[str], optional): F names of ROLLING_FEATURES. Defaults to all of them.
+
+    Returns:
+        ndarray: float32 array of shape (N, F * S), the S columns of the first feature first.
+            NaN where the window reaches back beyond the first value of a column.
+    """
+    values = np.asarray(values, dtype=np.float32)
+    if values.ndim == 1:
+        values = values[:, None]
+    steps = np.asarray(steps, dtype=np.int64)
+    out = np.empty((len(steps), len(features) * values.shape[1]), dtype=np.float32)
+    if len(steps) == 0:
+        return out
+    start, grid = regular_grid(steps, values)
+    grid = _fill_forward(grid)
+    rows = steps - start
+    for i, feature in enumerate(features):
+        out[:, i * values.shape[1]:(i + 1) * values.shape[1]] = _rolling_grid(grid, feature)[rows]
+    return out
+
+
+class RollingFeatures:
+    """Rolling features of a series that grows by new hours, see `rolling_matrix`.
+
+    Only the hours the windows of later hours reach back to are kept, such that
+    an update takes O(new hours + longest window) time, independent of the
+    length of the series so far.
+    """
+    def __init__(self, features: Sequence[str] = tuple(ROLLING_FEATURES)) -> None:
+        """
+        Args:
+            features (Sequence[str], optional): names of ROLLING_FEATURES. Defaults to all of them.
+        """
+        self.features = list(features)
+        self.history = max(ROLLING_FEATURES[feature][2] for feature in self.features)
+        # (filled) grid of the last `history` hours and its first hour
+        self._grid: Optional[ndarray] = None
+        self._start = 0
+
+    def update(self, steps: ndarray, values: ndarray) -> ndarray:
+        """Computes the rolling features of new hours.
+
+        Args:
+            steps (ndarray): hours of the N new rows, all after the hours of the previous updates.
+            values (ndarray): values of shape (N, S) or (N,), as in the previous updates.
+
+        Returns:
+            ndarray: float32 array of shape (N, F * S), as returned by `rolling_matrix`.
+        """
+        values = np.asarray(values, dtype=np.float32)
+        if values.ndim == 1:
+            values = values[:, None]
+        steps = np.asarray(steps, dtype=np.int64)
+        if len(steps) == 0:
+            return np.empty((0, len(self.features) * values.shape[1]), dtype=np.float32)
+
+        new_start, new_grid = regular_grid(steps, values)
+        if self._grid is None:
+            start, grid = new_start, new_grid
+        else:
+            start, end = self._start, self._start + len(self._grid)
+            if new_start < end:
+                raise ValueError(f"The hours of an update have to follow the last hour of the previous one ({end - 1})")
+            grid = np.full((new_start + len(new_grid) - start, values.shape[1]), np.nan, dtype=np.float32)
+            grid[:len(self._grid)] = self._grid
+            grid[new_start - start:] = new_grid
+        grid = _fill_forward(grid)
+
+        out = np.empty((len(steps), len(self.features) * values.shape[1]), dtype=np.float32)
+        rows = steps - start
+        for i, feature in enumerate(self.features):
+            out[:, i * values.shape[1]:(i + 1) * values.shape[1]] = _rolling_grid(grid, feature)[rows]
+
+        keep = min(len(grid), self.history)
+        self._start, self._grid = start + len(grid) - keep, grid[len(grid) - keep:]
+        return out
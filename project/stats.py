@@ -0,0 +1,56 @@
+"""Statistics of data that is processed in chunks, e.g. by the streaming ingestion."""
+import numpy as np
+from numpy import ndarray
+
+
+class RunningStats:
+    """Count, mean, variance, minimum and maximum of the columns of a stream of batches.
+
+    Batches are merged with the pairwise update of Chan et al., which is
+    numerically stable for any batch sizes. Missing values (NaN) are ignored.
+    """
+    def __init__(self, num_columns: int = 1) -> None:
+        self.count = np.zeros(num_columns, dtype=np.int64)
+        self.mean = np.zeros(num_columns)
+        self.min = np.full(num_columns, np.inf)
+        self.max = np.full(num_columns, -np.inf)
+        # sum of the squared differences from the mean
+        self._m2 = np.zeros(num_columns)
+
+    def update(self, batch: ndarray) -> "RunningStats":
+        """Adds a batch of shape (N, num_columns), or (N,) for a single column."""
+        batch = np.asarray(batch, dtype=np.float64)
+        if batch.ndim == 1:
+            batch = batch[:, None]
+        present = ~np.isnan(batch)
+        other = RunningStats(batch.shape[1])
+        other.count = present.sum(0)
+        if not other.count.any():
+            return self
+        values = np.where(present, batch, 0.0)
+        other.mean = values.sum(0) / np.maximum(other.count, 1)
+        other._m2 = (np.where(present, batch - other.mean, 0.0) ** 2).sum(0)
+        other.min = np.where(present, batch, np.inf).min(0)
+        other.max = np.where(present, batch, -np.inf).max(0)
+        return self.merge(other)
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Adds the statistics of another part of the data."""
+        count = self.count + other.count
+        weight = np.divide(other.count, count, out=np.zeros(len(count)), where=count > 0)
+        delta = other.mean - self.mean
+        self.mean = self.mean + delta * weight
+        self._m2 = self._m2 + other._m2 + delta ** 2 * self.count * weight
+        self.count = count
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        return self
+
+    @property
+    def variance(self) -> ndarray:
+        """Population variance (ddof=0) as used by scikit-learn's StandardScaler, NaN for empty columns."""
+        return np.divide(self._m2, self.count, out=np.full(len(self.count), np.nan), where=self.count > 0)
+
+    @property
+    def std(self) -> ndarray:
+        return np.sqrt(self.variance)
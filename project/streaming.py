@@ -0,0 +1,98 @@
+"""Streaming preprocessing of the raw time-series, chunk by chunk in constant memory.
+
+`StreamingFeatures` turns time-ordered chunks of raw rows into the same
+training features that `prepare_data`, `add_features` and `make_features`
+compute from the whole data. Between the chunks it only keeps the rows the
+lags of later rows reach back to and the state of the rolling features.
+"""
+from typing import List, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+from pandas import DataFrame, concat
+
+import project.utils as utils
+from config import Config
+from project.lags import step_index
+from project.rolling import ROLLING_FEATURES, RollingFeatures
+
+
+class StreamingFeatures:
+    """Training features of a stream of raw chunks, see `update`."""
+    def __init__(self, station: str, features: List[str], computed_features: List[str] = []) -> None:
+        """
+        Args:
+            station (str): name of station to use for training.
+            features (List[str]): features of the training data, as passed to `make_features`.
+            computed_features (List[str], optional): features to compute instead of reading them from the chunks,
+                see `utils.add_features`. Defaults to [].
+        """
+        self.station = station
+        self.features = features
+        self.read_features = [feature for feature in features if feature not in computed_features]
+        self._rolling_names = [feature for feature in computed_features if feature in ROLLING_FEATURES]
+        self._calendar_names = [feature for feature in computed_features if feature not in ROLLING_FEATURES]
+        self._rolling = RollingFeatures(self._rolling_names) if self._rolling_names else None
+        # longest lag of make_features, in time-steps
+        self._history = max(Config.YEAR_SHIFT, Config.WEEK_SHIFT, 1) * Config.VALUES_PER_DAY
+        self._tail: Optional[DataFrame] = None
+        self._last_step: Optional[int] = None
+        # as reported by prepare_data, summed over the chunks
+        self.repairs = {"unsorted": False, "missing": 0, "duplicates": 0}
+
+    def update(self, chunk: DataFrame) -> Optional[DataFrame]:
+        """Computes the training features of the rows of a chunk.
+
+        The rows of a chunk may be unordered, but have to follow the rows of
+        the previous chunks in time. Rows repeating the last timestamp of the
+        previous chunk are dropped as duplicates.
+
+        Args:
+            chunk (DataFrame): raw rows with the "Datetime", station and read feature columns.
+
+        Returns:
+            Optional[DataFrame]: the rows of the chunk as returned by `make_features`, None if there are none.
+        """
+        df, steps = self.prepare(chunk)
+        if not len(df):
+            return None
+
+        if self._rolling is not None:
+            df[self._rolling_names] = self._rolling.update(steps, df.value.to_numpy(dtype=np.float32))
+        df = utils.add_features(df, self._calendar_names)
+
+        data = df if self._tail is None else concat([self._tail, df])
+        train_data = utils.make_features(data, features=self.features)
+        if self._tail is not None:
+            train_data = train_data[train_data.index > self._tail.index[-1]]
+
+        # the rows the lags of the following chunks can reach back to
+        data_steps = step_index(data.index, Config.VALUES_PER_DAY)
+        self._tail = data[data_steps > self._last_step - self._history]
+        return train_data
+
+    def prepare(self, chunk: DataFrame) -> Tuple[DataFrame, ndarray]:
+        """Validates the rows of a chunk as `prepare_data` does for the whole data, without
+        computing any features, see `update` for the requirements on the chunks.
+
+        Returns:
+            Tuple[DataFrame, ndarray]: the rows `prepare_data` keeps of the chunk and their time-steps.
+        """
+        df = utils.prepare_data(chunk, station=self.station, features=self.read_features)
+        repairs = df.attrs["repairs"]
+        self.repairs["unsorted"] |= repairs["unsorted"]
+        self.repairs["missing"] += repairs["missing"]
+        self.repairs["duplicates"] += repairs["duplicates"]
+        steps = step_index(df.index, Config.VALUES_PER_DAY)
+        if self._last_step is not None and len(steps):
+            if steps[0] < self._last_step:
+                raise ValueError(
+                    f"The chunk starting at {df.index[0]} goes back before the previous one, "
+                    "streaming requires the data to be sorted by Datetime"
+                )
+            new = steps > self._last_step
+            self.repairs["duplicates"] += int(len(steps) - new.sum())
+            df, steps = df[new], steps[new]
+        if len(steps):
+            self._last_step = int(steps[-1])
+        return df, steps
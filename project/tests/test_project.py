@@ -0,0 +1,269 @@
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pytest
+import torch
+import torch.utils.data as data_utils
+import pytorch_lightning as pl
+
+import ncps
+from ncps.torch import LTC
+from project.model import SequenceLearner
+from project.calendar_features import CALENDAR_FEATURES, calendar_matrix, day_flags, us_holidays
+from project.lags import lag_matrix, step_index
+from project.rolling import ROLLING_FEATURES, RollingFeatures, rolling_matrix
+from project.stats import RunningStats
+from project.trainer import FastTrainer
+from project.utils import prepare_data
+
+
+def _learner():
+    torch.manual_seed(0)
+    model = LTC(4, ncps.wirings.AutoNCP(8, 1, seed=1), batch_first=True)
+    return SequenceLearner(model, lr=0.01, features_num=4, device="cpu")
+
+
+def test_fast_trainer_matches_lightning_score():
+    torch.manual_seed(1)
+    # the last batch is smaller, the epoch loss is the plain mean over the batches nevertheless
+    ds = data_utils.TensorDataset(torch.rand(170, 4), 0.5 + torch.rand(170, 1))
+    dataloader = data_utils.DataLoader(ds, batch_size=32)
+    with tempfile.TemporaryDirectory() as tmpdir:
+        checkpoint_callback = pl.callbacks.ModelCheckpoint(
+            monitor="train_loss_epoch", dirpath=tmpdir, filename="lightning", mode="min"
+        )
+        trainer = pl.Trainer(
+            max_epochs=2,
+            callbacks=[checkpoint_callback],
+            logger=False,
+            gradient_clip_val=1,
+            enable_progress_bar=False,
+            enable_model_summary=False,
+        )
+        trainer.fit(_learner(), dataloader)
+        fast = FastTrainer(max_epochs=2, gradient_clip_val=1, dirpath=tmpdir, filename="fast")
+        fast.fit(_learner(), dataloader)
+        assert fast.best_model_score == pytest.approx(float(checkpoint_callback.best_model_score), rel=1e-5)
+        assert os.path.exists(fast.best_model_path)
+
+
+def _prepare_data_baseline(df, station, features=[]):
+    # prepare_data before the one-pass validation
+    df = df.reset_index()[["Datetime", station, *features]].rename(
+        columns={"Datetime": "datetime", station: "value"}
+    )
+    df = df.set_index("datetime")
+    df = df.loc[df.index.sort_values()]
+    df = df.dropna()
+    return df[~df.index.duplicated(keep="first")]
+
+
+def _raw_data(num_rows=48, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {"AEP": rng.uniform(100, 200, num_rows), "temp": rng.uniform(-10, 30, num_rows)},
+        index=pd.date_range("2017-01-01", periods=num_rows, freq="h", name="Datetime"),
+    )
+
+
+def _assert_prepared(df, expected, repairs):
+    prepared = prepare_data(df, "AEP", features=["temp"])
+    pd.testing.assert_frame_equal(prepared, expected, check_freq=False)
+    assert prepared.attrs["repairs"] == repairs
+
+
+def test_prepare_data_clean():
+    df = _raw_data()
+    expected = _prepare_data_baseline(df, "AEP", ["temp"])
+    _assert_prepared(df, expected, {"unsorted": False, "missing": 0, "duplicates": 0})
+
+
+def test_prepare_data_unsorted():
+    df = _raw_data().sample(frac=1, random_state=0)
+    expected = _prepare_data_baseline(df, "AEP", ["temp"])
+    _assert_prepared(df, expected, {"unsorted": True, "missing": 0, "duplicates": 0})
+
+
+def test_prepare_data_duplicates_only():
+    df = _raw_data()
+    # sorted, with two hours twice, the first of them is kept
+    df = pd.concat([df, df.iloc[[5, 20]] + 1]).sort_index(kind="stable")
+    expected = _prepare_data_baseline(df, "AEP", ["temp"])
+    _assert_prepared(df, expected, {"unsorted": False, "missing": 0, "duplicates": 2})
+    # duplicated and unsorted
+    df = df.iloc[::-1]
+    expected = _prepare_data_baseline(df, "AEP", ["temp"])
+    _assert_prepared(df, expected, {"unsorted": True, "missing": 0, "duplicates": 2})
+
+
+def test_prepare_data_missing_values():
+    df = _raw_data()
+    df.iloc[[3, 10], 0] = np.nan
+    df.iloc[11, 1] = np.nan
+    # the first of two rows of an hour is missing, the second is kept
+    df = pd.concat([df, df.iloc[[3]].fillna(150.0)]).sort_index(kind="stable")
+    expected = _prepare_data_baseline(df, "AEP", ["temp"])
+    _assert_prepared(df, expected, {"unsorted": False, "missing": 3, "duplicates": 0})
+    assert prepare_data(df, "AEP", features=["temp"]).loc[df.index[3], "value"] == 150.0
+
+
+def test_prepare_data_group_column():
+    stations = {"AEP": _raw_data(seed=0), "DOM": _raw_data(seed=1)}
+    stations["DOM"].iloc[7, 0] = np.nan
+    stations["DOM"] = pd.concat([stations["DOM"], stations["DOM"].iloc[[2]]])
+    long = pd.concat(
+        [df.rename(columns={"AEP": "load"}).assign(station=name) for name, df in stations.items()]
+    ).sample(frac=1, random_state=0)
+    prepared = prepare_data(long, "load", features=["temp"], group_column="station")
+    assert prepared.attrs["repairs"] == {"unsorted": True, "missing": 1, "duplicates": 1}
+    # every station as if prepared on its own, the stations are in the order of their first row
+    assert list(pd.unique(prepared["station"])) == list(pd.unique(long["station"]))
+    for name, df in stations.items():
+        expected = _prepare_data_baseline(df, "AEP", ["temp"])
+        pd.testing.assert_frame_equal(
+            prepared[prepared["station"] == name].drop(columns="station"), expected, check_freq=False
+        )
+
+
+def _gappy_series(num_hours=24 * 12, num_columns=2, seed=0):
+    rng = np.random.default_rng(seed)
+    index = pd.date_range("2016-12-20", periods=num_hours, freq="h")
+    values = rng.uniform(100, 200, (num_hours, num_columns)).astype(np.float32)
+    values[rng.random(values.shape) < 0.02] = np.nan
+    # missing hours, a single one and a whole day
+    keep = np.ones(num_hours, dtype=bool)
+    keep[[30, 100]] = False
+    keep[150:174] = False
+    return pd.DataFrame(values[keep], index=index[keep])
+
+
+def test_lag_matrix_matches_shift():
+    df = _gappy_series()
+    lags = [(column, lag) for column in range(2) for lag in [0, 1, 24, 168, 24 * 30]]
+    grid = df.asfreq("h")
+    expected = np.stack([grid[column].shift(lag)[df.index].to_numpy() for column, lag in lags], axis=1)
+    # the rows need not be sorted
+    order = np.random.default_rng(0).permutation(len(df))
+    lagged, present = lag_matrix(step_index(df.index[order]), df.to_numpy()[order], lags)
+    np.testing.assert_array_equal(lagged, expected[order])
+    np.testing.assert_array_equal(present, ~np.isnan(expected[order]))
+
+
+def _rolling_reference(df, feature):
+    statistic, first, last = ROLLING_FEATURES[feature]
+    grid = df.asfreq("h").ffill()
+    windows = grid.shift(first).rolling(last - first + 1)
+    return getattr(windows, statistic)().loc[df.index].to_numpy()
+
+
+def test_rolling_matrix_matches_pandas():
+    df = _gappy_series()
+    features = list(ROLLING_FEATURES)
+    expected = np.concatenate([_rolling_reference(df, feature) for feature in features], axis=1)
+    result = rolling_matrix(step_index(df.index), df.to_numpy(), features)
+    np.testing.assert_allclose(result, expected, rtol=1e-5)
+    # no window before the first hour, and the last hour is complete
+    assert np.isnan(result[:25]).all() and not np.isnan(result[-1]).any()
+
+    # windows longer than the data
+    short = df.iloc[:30]
+    assert np.isnan(rolling_matrix(step_index(short.index), short.to_numpy(), features)).all()
+
+
+def test_rolling_features_in_chunks():
+    df = _gappy_series()
+    steps, values = step_index(df.index), df.to_numpy()
+    expected = rolling_matrix(steps, values)
+    rolling = RollingFeatures()
+    # chunks shorter than the windows, such that the windows span several of them,
+    # and a chunk boundary in the missing day
+    bounds = [0, 7, 40, 60, 140, 160, len(df)]
+    result = np.concatenate([
+        rolling.update(steps[start:end], values[start:end]) for start, end in zip(bounds[:-1], bounds[1:])
+    ])
+    np.testing.assert_allclose(result, expected, rtol=1e-5)
+    with pytest.raises(ValueError):
+        rolling.update(steps[:1], values[:1])
+
+
+def _calendar_reference(days):
+    holidays = set()
+    for year in range(days.min().year - 1, days.max().year + 2):
+        holidays.update(pd.Timestamp(day) for day in us_holidays(year))
+    holiday = lambda d: d.map(lambda day: day in holidays).to_numpy(dtype=bool)
+    weekend = lambda d: np.asarray(d.dayofweek >= 5)
+    one_day = pd.Timedelta(days=1)
+    return {
+        "WorkDay": ~(holiday(days) | weekend(days)),
+        "LastDayWasHolodiayAndNotWeekend": holiday(days - one_day) & ~weekend(days),
+        "NextDayIsHolidayAndNotWeekend": holiday(days + one_day) & ~weekend(days + one_day),
+    }
+
+
+def test_us_holidays_match_pandas():
+    from pandas.tseries.holiday import USColumbusDay, USFederalHolidayCalendar
+    calendar = USFederalHolidayCalendar()
+    for year in range(2004, 2025):
+        expected = calendar.holidays(f"{year}-01-01", f"{year}-12-31")
+        expected = expected.drop(USColumbusDay.dates(f"{year}-01-01", f"{year}-12-31"))
+        days = [pd.Timestamp(day) for day in us_holidays(year)]
+        # pandas assigns the observed day of a Saturday New Year's Day to the year it falls in
+        days = [day for day in days if day.year == year]
+        if pd.Timestamp(f"{year + 1}-01-01").dayofweek == 5:
+            days.append(pd.Timestamp(f"{year}-12-31"))
+        assert days == list(expected), year
+
+
+def test_calendar_matrix_matches_reference():
+    # New Year's Day 2017 was a Sunday (observed on Monday, January 2nd), July 4th 2015 a Saturday
+    # (observed on Friday, July 3rd), and New Year's Day 2022 a Saturday (observed on Friday, December 31st)
+    hours = pd.DatetimeIndex(np.concatenate([
+        pd.date_range("2014-12-20", "2015-07-10", freq="h"),
+        pd.date_range("2016-12-25", "2017-01-10", freq="h"),
+        pd.date_range("2021-12-25", "2022-01-05", freq="h"),
+    ]))
+    features = list(CALENDAR_FEATURES)
+    result = calendar_matrix(step_index(hours) // 24, features)
+    expected = _calendar_reference(hours.normalize())
+    for i, feature in enumerate(features):
+        np.testing.assert_array_equal(result[:, i], expected[feature].astype(np.float32), err_msg=feature)
+    flags = pd.DataFrame(result, index=hours, columns=features).resample("D").first()
+    assert flags.loc["2017-01-02", "WorkDay"] == 0 and flags.loc["2017-01-03", "LastDayWasHolodiayAndNotWeekend"] == 1
+    assert flags.loc["2015-07-02", "NextDayIsHolidayAndNotWeekend"] == 1 and flags.loc["2015-07-03", "WorkDay"] == 0
+    assert flags.loc["2021-12-30", "NextDayIsHolidayAndNotWeekend"] == 1
+
+
+def test_day_flags_cache():
+    with tempfile.TemporaryDirectory() as tmpdir:
+        first_day, flags = day_flags(2015, 2017)
+        cached = day_flags(2015, 2017, cache_dir=tmpdir)
+        assert os.listdir(tmpdir)
+        assert cached[0] == first_day
+        np.testing.assert_array_equal(day_flags(2015, 2017, cache_dir=tmpdir)[1], flags)
+        np.testing.assert_array_equal(cached[1], flags)
+
+
+def test_running_stats_matches_numpy():
+    rng = np.random.default_rng(0)
+    # a large offset, which a naive sum of squares would lose the variance to
+    data = 1e8 + rng.normal(0, 3, (1000, 3))
+    data[rng.random(data.shape) < 0.05] = np.nan
+    data[:, 2] = np.nan
+    data[500:, 2] = 1.0
+    stats = RunningStats(3)
+    for start, end in [(0, 1), (1, 10), (10, 10), (10, 500), (500, 999), (999, 1000)]:
+        stats.update(data[start:end])
+    np.testing.assert_array_equal(stats.count, (~np.isnan(data)).sum(0))
+    np.testing.assert_allclose(stats.mean, np.nanmean(data, 0), rtol=1e-12)
+    np.testing.assert_allclose(stats.variance, np.nanvar(data, 0), rtol=1e-8, atol=1e-12)
+    np.testing.assert_array_equal(stats.min, np.nanmin(data, 0))
+    np.testing.assert_array_equal(stats.max, np.nanmax(data, 0))
+
+    # merging the statistics of two parts is the same as updating with both
+    first, second = RunningStats(3).update(data[:300]), RunningStats(3).update(data[300:])
+    merged = first.merge(second)
+    np.testing.assert_allclose(merged.mean, stats.mean, rtol=1e-12)
+    np.testing.assert_allclose(merged.variance, stats.variance, rtol=1e-8, atol=1e-12)
+    assert np.isnan(RunningStats(2).variance).all()
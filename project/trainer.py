@@ -0,0 +1,280 @@
+import os
+import csv
+from typing import List, Optional
+
+import torch
+import pytorch_lightning as pl
+from torch.func import functional_call, vmap
+
+from project.model import SequenceLearner, mape
+
+
+def save_checkpoint(
+        learner: SequenceLearner,
+        path: str,
+        epoch: int,
+        global_step: int,
+        optimizer: Optional[torch.optim.Optimizer] = None,
+        trainer_state: Optional[dict] = None) -> None:
+    """Writes a checkpoint in the Lightning format, i.e. one that can be loaded with
+    `SequenceLearner.load_from_checkpoint(path, model=model)`.
+
+    The optimizer and trainer state are only needed to resume the training.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    checkpoint = {
+        "epoch": epoch,
+        "global_step": global_step,
+        "pytorch-lightning_version": pl.__version__,
+        "state_dict": learner.state_dict(),
+        learner.CHECKPOINT_HYPER_PARAMS_KEY: dict(learner.hparams),
+    }
+    if optimizer is not None:
+        checkpoint["optimizer_states"] = [optimizer.state_dict()]
+    if trainer_state is not None:
+        checkpoint["fast_trainer"] = trainer_state
+    torch.save(checkpoint, path)
+
+
+class FastTrainer:
+    """Minimal replacement of `pytorch_lightning.Trainer` for training a SequenceLearner.
+
+    Small liquid networks need only a fraction of a millisecond per step, such
+    that the per-step overhead of the Lightning Trainer (callbacks, logging,
+    metric objects) dominates the training time. This loop does only what
+    `run.train` needs: optimizing the MAPE, clipping the gradients, logging the
+    loss every `log_every_n_steps` steps and keeping the checkpoint of the
+    epoch with the lowest mean training loss. The losses are logged under the
+    names of SequenceLearner, `train_loss_step` and `train_loss_epoch`, the
+    `best_model_score` is the same quantity as the `train_loss_epoch` the
+    Lightning checkpoints are selected by. The checkpoints are written in
+    the Lightning format, i.e. they can be loaded with
+    `SequenceLearner.load_from_checkpoint(path, model=model)`.
+
+    With `save_last=True` the state at the end of every epoch is written to
+    last.ckpt as well, from which `fit(..., ckpt_path=...)` resumes the
+    training, e.g. with a larger `max_epochs`.
+    """
+    def __init__(
+            self,
+            max_epochs: int,
+            gradient_clip_val: Optional[float] = None,
+            log_every_n_steps: int = 50,
+            dirpath: Optional[str] = None,
+            filename: str = "model",
+            log_dir: Optional[str] = None,
+            save_last: bool = False) -> None:
+        """
+        Args:
+            max_epochs (int): number of epochs to train.
+            gradient_clip_val (float, optional): maximum norm of the gradients. Defaults to None (no clipping).
+            log_every_n_steps (int, optional): interval of the logged training losses. Defaults to 50.
+            dirpath (str, optional): directory of the checkpoint. Defaults to None (no checkpoint is written).
+            filename (str, optional): name of the checkpoint, without the extension. Defaults to "model".
+            log_dir (str, optional): directory of the metrics.csv with the logged losses. Defaults to None (no file is written).
+            save_last (bool, optional): whether to write last.ckpt into `dirpath` after every epoch. Defaults to False.
+        """
+        if log_every_n_steps < 1:
+            raise ValueError(f"Invalid log_every_n_steps {log_every_n_steps}, expected a positive integer")
+        self.max_epochs = max_epochs
+        self.gradient_clip_val = gradient_clip_val
+        self.log_every_n_steps = log_every_n_steps
+        self.dirpath = dirpath
+        self.filename = filename
+        self.log_dir = log_dir
+        self.save_last = save_last
+        self.global_step = 0
+        self.logged_metrics = []
+        self.best_model_path = None
+        self.best_model_score = None
+
+    def fit(self, learner: SequenceLearner, dataloader, ckpt_path: Optional[str] = None) -> None:
+        """
+        Args:
+            learner (SequenceLearner): learner to train.
+            dataloader (DataLoader): training batches.
+            ckpt_path (str, optional): last.ckpt of a previous fit to resume from. Defaults to None.
+        """
+        if learner.tbptt_steps is not None:
+            raise ValueError("FastTrainer does not support truncated BPTT, use the Lightning Trainer instead")
+        device = learner.mydevice
+        model = learner.model.to(device)
+        optimizer = learner.configure_optimizers()
+        parameters = [p for p in model.parameters() if p.requires_grad]
+        start_epoch = 0
+        if ckpt_path is not None:
+            start_epoch = self._restore(ckpt_path, learner, optimizer)
+
+        model.train()
+        for epoch in range(start_epoch, self.max_epochs):
+            # the running sum stays on the device, syncing only when logging
+            epoch_loss = torch.zeros((), device=device)
+            hx = None
+            for batch_idx, (x, y) in enumerate(dataloader):
+                x = x.to(device, non_blocking=True)
+                y = y.to(device, non_blocking=True)
+                x, y, burn_in = learner._reshape_batch(x, y)
+
+                y_hat, next_hx = model(x, hx)
+                if learner.stateful:
+                    hx = learner._detach_state(next_hx)
+                loss = mape(y_hat.view_as(y)[:, burn_in:], y[:, burn_in:])
+
+                optimizer.zero_grad(set_to_none=True)
+                loss.backward()
+                if self.gradient_clip_val is not None:
+                    torch.nn.utils.clip_grad_norm_(parameters, self.gradient_clip_val)
+                optimizer.step()
+
+                epoch_loss += loss.detach()
+                self.global_step += 1
+                if self.global_step % self.log_every_n_steps == 0:
+                    self.logged_metrics.append(
+                        {"epoch": epoch, "step": self.global_step, "train_loss_step": loss.item()}
+                    )
+
+            epoch_loss = epoch_loss.item() / (batch_idx + 1)
+            self.logged_metrics.append(
+                {"epoch": epoch, "step": self.global_step, "train_loss_epoch": epoch_loss}
+            )
+            if self.best_model_score is None or epoch_loss < self.best_model_score:
+                self.best_model_score = epoch_loss
+                self._save_checkpoint(learner, epoch)
+            if self.save_last and self.dirpath is not None:
+                save_checkpoint(
+                    learner,
+                    os.path.join(self.dirpath, "last.ckpt"),
+                    epoch,
+                    self.global_step,
+                    optimizer=optimizer,
+                    trainer_state={
+                        "best_model_path": self.best_model_path,
+                        "best_model_score": self.best_model_score,
+                    },
+                )
+        self._write_metrics()
+
+    def _restore(self, ckpt_path: str, learner: SequenceLearner, optimizer: torch.optim.Optimizer) -> int:
+        checkpoint = torch.load(ckpt_path, map_location=learner.mydevice, weights_only=False)
+        learner.load_state_dict(checkpoint["state_dict"])
+        optimizer.load_state_dict(checkpoint["optimizer_states"][0])
+        self.global_step = checkpoint["global_step"]
+        self.best_model_path = checkpoint["fast_trainer"]["best_model_path"]
+        self.best_model_score = checkpoint["fast_trainer"]["best_model_score"]
+        return checkpoint["epoch"] + 1
+
+    def _save_checkpoint(self, learner: SequenceLearner, epoch: int) -> None:
+        if self.dirpath is None:
+            return
+        self.best_model_path = os.path.join(self.dirpath, f"{self.filename}.ckpt")
+        save_checkpoint(learner, self.best_model_path, epoch, self.global_step)
+
+    def _write_metrics(self) -> None:
+        if self.log_dir is None or not self.logged_metrics:
+            return
+        os.makedirs(self.log_dir, exist_ok=True)
+        with open(os.path.join(self.log_dir, "metrics.csv"), "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["epoch", "step", "train_loss_step", "train_loss_epoch"])
+            writer.writeheader()
+            writer.writerows(self.logged_metrics)
+
+
+class EnsembleTrainer:
+    """Trains several learners of the same architecture at once, as one vectorized model.
+
+    The models of the learners may differ in their initialization, learning
+    rate and number of epochs, but need parameters of the same names and
+    shapes (e.g. LTCs with the same wiring and activation). In every step
+    the parameters of the members are stacked and the base model is run
+    on them with `torch.func.vmap`/`functional_call`, such that the
+    members share the (sequential) time loop and each matmul covers all of
+    them. Every member has its own optimizer and gradient clipping, so the
+    training of a member is the same as training it on its own. Members
+    drop out of the stack once their number of epochs is reached.
+
+    Like FastTrainer, the checkpoint of the epoch with the lowest mean
+    training loss of every member is kept, in the Lightning format.
+    """
+    def __init__(
+            self,
+            max_epochs: List[int],
+            gradient_clip_val: Optional[float] = None,
+            dirpath: Optional[str] = None,
+            filenames: Optional[List[str]] = None) -> None:
+        """
+        Args:
+            max_epochs (List[int]): number of epochs to train every member.
+            gradient_clip_val (float, optional): maximum norm of the gradients of every member. Defaults to None (no clipping).
+            dirpath (str, optional): directory of the checkpoints. Defaults to None (no checkpoints are written).
+            filenames (List[str], optional): names of the checkpoints of the members, without the extension. Defaults to model-<index>.
+        """
+        self.max_epochs = max_epochs
+        self.gradient_clip_val = gradient_clip_val
+        self.dirpath = dirpath
+        self.filenames = filenames or [f"model-{i}" for i in range(len(max_epochs))]
+        if len(self.filenames) != len(max_epochs):
+            raise ValueError(f"Got {len(self.filenames)} filenames for {len(max_epochs)} members")
+        self.global_step = 0
+        self.best_model_paths = [None] * len(max_epochs)
+        self.best_model_scores = [None] * len(max_epochs)
+
+    def fit(self, learners: List[SequenceLearner], dataloader) -> None:
+        if len(learners) != len(self.max_epochs):
+            raise ValueError(f"Got {len(learners)} learners for {len(self.max_epochs)} max_epochs")
+        if any(learner.stateful or learner.tbptt_steps is not None for learner in learners):
+            raise ValueError("EnsembleTrainer does not support stateful training or truncated BPTT")
+        base = learners[0]
+        device = base.mydevice
+        models = [learner.model.to(device) for learner in learners]
+        shapes = [{n: p.shape for n, p in model.named_parameters()} for model in models]
+        if any(shape != shapes[0] for shape in shapes):
+            raise ValueError("The models of an ensemble need parameters of the same names and shapes")
+        names = list(shapes[0])
+        optimizers = [learner.configure_optimizers() for learner in learners]
+        parameters = [[p for p in model.parameters() if p.requires_grad] for model in models]
+
+        def forward(params, x):
+            return functional_call(base.model, params, (x,))[0]
+
+        forward = vmap(forward, in_dims=(0, None))
+        loss_fn = vmap(mape, in_dims=(0, None))
+
+        for model in models:
+            model.train()
+        active = list(range(len(learners)))
+        for epoch in range(max(self.max_epochs)):
+            active = [i for i in active if epoch < self.max_epochs[i]]
+            epoch_loss = torch.zeros(len(active), device=device)
+            for batch_idx, (x, y) in enumerate(dataloader):
+                x = x.to(device, non_blocking=True)
+                y = y.to(device, non_blocking=True)
+                x, y, burn_in = base._reshape_batch(x, y)
+
+                member_params = [dict(models[i].named_parameters()) for i in active]
+                params = {n: torch.stack([p[n] for p in member_params]) for n in names}
+                y_hat = forward(params, x)
+                losses = loss_fn(y_hat.view(len(active), *y.shape)[:, :, burn_in:], y[:, burn_in:])
+
+                for i in active:
+                    optimizers[i].zero_grad(set_to_none=True)
+                # The members do not share parameters, hence the gradient of the sum
+                # with respect to a member is the gradient of its own loss
+                losses.sum().backward()
+                for i in active:
+                    if self.gradient_clip_val is not None:
+                        torch.nn.utils.clip_grad_norm_(parameters[i], self.gradient_clip_val)
+                    optimizers[i].step()
+
+                epoch_loss += losses.detach()
+                self.global_step += 1
+
+            for i, loss in zip(active, (epoch_loss / (batch_idx + 1)).tolist()):
+                if self.best_model_scores[i] is None or loss < self.best_model_scores[i]:
+                    self.best_model_scores[i] = loss
+                    self._save_checkpoint(learners[i], i, epoch)
+
+    def _save_checkpoint(self, learner: SequenceLearner, member: int, epoch: int) -> None:
+        if self.dirpath is None:
+            return
+        self.best_model_paths[member] = os.path.join(self.dirpath, f"{self.filenames[member]}.ckpt")
+        save_checkpoint(learner, self.best_model_paths[member], epoch, self.global_step)
@@ -1,42 +1,109 @@
+import os
 from datetime import datetime, timedelta
-from typing import Tuple, Union, Dict
+from typing import Tuple, Union, Dict, Optional
 
 from torch import Tensor
-from numpy import ndarray, transpose, float64
-from pandas import DataFrame, Series
+from numpy import ndarray, float32, arange, lexsort, ones, all as np_all
+from pandas import DataFrame, DatetimeIndex, Series, factorize, to_datetime
 
 from config import Config
+from project.lags import lag_matrix, step_index
+from project.rolling import ROLLING_FEATURES, rolling_matrix
+from project.calendar_features import CALENDAR_FEATURES, calendar_matrix
 
+# version of the preprocessing, part of the FeatureStore keys, increase it whenever the output changes
+PIPELINE_VERSION = 2
 
-def prepare_data(df: DataFrame, station: str, features: list[str] = []) -> DataFrame:
+
+def prepare_data(
+        df: DataFrame, station: str, features: list[str] = [], group_column: Optional[str] = None) -> DataFrame:
     """Makes sure that the incoming data
     1. has no duplicated indexes,
     2. has no duplicated values,
     3. has validated column names,
     4. has ascending sorted datetime index.
 
+    Order and uniqueness are checked in one pass over the timestamps, the rows
+    are only copied if they have to be reordered or dropped. What was repaired
+    is reported in `attrs["repairs"]` of the result: whether the rows were
+    unsorted and the numbers of rows dropped for missing values and for
+    duplicated timestamps (the first of them is kept).
+
     Args:
-        df (DataFrame): not validated dataframe of raw time-series data.
-        station (str): name of station to use for training.
+        df (DataFrame): not validated dataframe of raw time-series data, with a "Datetime" column or index.
+        station (str): name of station to use for training, i.e. of the column of its values.
         features (list, optional): list of column names should be taken into training. Defaults to [].
+        group_column (str, optional): column identifying the series of a frame holding many of them
+            (e.g. the station of a frame in long format). The rows are then sorted by group and datetime
+            and the timestamps only need to be unique within a group. Defaults to None (a single series).
 
     Returns:
         DataFrame: DataFrame meeting all the requirements.
     """
-    df = df.reset_index()[["Datetime", station, *features]].rename(
-        columns={
-            "Datetime": "datetime",
-            station: "value"
-        }
+    columns = [station, *features] + ([group_column] if group_column else [])
+    timestamps = df.index if df.index.name == "Datetime" else df["Datetime"]
+    df = DataFrame(
+        {"value" if column == station else column: df[column].to_numpy() for column in columns},
+        index=DatetimeIndex(to_datetime(timestamps), name="datetime"),
+        copy=False
     )
-    df = df.set_index("datetime")
 
-    sorted_idx = df.index.sort_values()
-    
-    df = df.loc[sorted_idx]
-    df = df.dropna()
-    df = df[~df.index.duplicated(keep='first')]
+    times = df.index.asi8
+    groups = factorize(df[group_column])[0] if group_column else None
+    # one pass: ascending by (group,) datetime, and no timestamp twice (within a group)
+    if groups is None:
+        ordered = bool(np_all(times[1:] > times[:-1]))
+    else:
+        ordered = bool(np_all((groups[1:] > groups[:-1]) | ((groups[1:] == groups[:-1]) & (times[1:] > times[:-1]))))
+    present = df.notna().to_numpy().all(1)
+    repairs = {"unsorted": False, "missing": int(len(df) - present.sum()), "duplicates": 0}
+
+    if not ordered or repairs["missing"]:
+        # duplicated timestamps alone do not need a sort
+        if groups is None:
+            ascending = bool(np_all(times[1:] >= times[:-1]))
+        else:
+            ascending = bool(np_all((groups[1:] > groups[:-1]) | ((groups[1:] == groups[:-1]) & (times[1:] >= times[:-1]))))
+        # a stable sort keeps duplicated timestamps in the order of the file
+        rows = arange(len(df)) if ascending else lexsort((times,) if groups is None else (times, groups))
+        repairs["unsorted"] = not ascending
+        rows = rows[present[rows]]
+        first = ones(len(rows), dtype=bool)
+        first[1:] = times[rows[1:]] != times[rows[:-1]]
+        if groups is not None:
+            first[1:] |= groups[rows[1:]] != groups[rows[:-1]]
+        repairs["duplicates"] = int(len(rows) - first.sum())
+        df = df.take(rows[first])
+
+    df.attrs["repairs"] = repairs
+    return df
+
+
+def computed_features(features: list[str]) -> list[str]:
+    """Returns the features that `add_features` can compute from the series itself."""
+    return [feature for feature in features if feature in ROLLING_FEATURES or feature in CALENDAR_FEATURES]
+
+
+def add_features(df: DataFrame, features: list[str]) -> DataFrame:
+    """Adds the features (see `computed_features`) computed from the timestamps and the hourly
+    values of `df.value` as columns, instead of reading them from the output of the R analysis.
+
+    Args:
+        df (DataFrame): dataframe returned by `prepare_data`.
+        features (list[str]): names of the features to compute.
 
+    Returns:
+        DataFrame: df with the added float32 columns, NaN where the data is too short for them.
+    """
+    rolling = [feature for feature in features if feature in ROLLING_FEATURES]
+    calendar = [feature for feature in features if feature in CALENDAR_FEATURES]
+    steps = step_index(df.index, Config.VALUES_PER_DAY)
+    if rolling:
+        df[rolling] = rolling_matrix(steps, df.value.to_numpy(dtype=float32), rolling)
+    if calendar:
+        # the per-day table is cached next to the preprocessed training arrays
+        cache_dir = os.path.join(Config.FEATURE_STORE_PATH, "calendar")
+        df[calendar] = calendar_matrix(steps // Config.VALUES_PER_DAY, calendar, cache_dir=cache_dir)
     return df
 
 
@@ -49,63 +116,37 @@ def denormalize_data(scaler, data: Union[ndarray, Tensor]) -> Union[ndarray, Ten
 
 
 def make_features(df: Series, features: list[str] = []) -> DataFrame:
-    """Here take following actions in-place
-    1. converts all existing features to uninfied format, e.g. float64,
-    2. adds shifted variables (year, week) shift to the df.
+    """Builds the training features of every hour from its timestamp
+    1. x = y(-1d), x_shifted_week = y(-7d) and x_shifted_year = y(-365d),
+    2. the features of the same hour as x_shifted_year,
+    all as float32. Hours missing any of them (e.g. the first year, or
+    hours following a gap in the data) are dropped.
 
     Args:
-        df (Series): dataframe of time-series data.
+        df (Series): dataframe of time-series data with a datetime index.
         features (list, optional): list of column names should be taken into training. Defaults to [].
 
     Returns:
         DataFrame: dataframe containing all features for training.
     """
-    values = df.value.values
-    # convert features to unified format // float64
-    features_values = []
-    if features:
-        features_values = transpose(df[features].values)
-        features_values = features_values.astype(float64)
-    
-    # x = y(-1d)
-    x = values[(Config.YEAR_SHIFT * Config.VALUES_PER_DAY) - Config.VALUES_PER_DAY:]
-    # x_week = y(-7d)
-    x_shifted_week = values[(Config.YEAR_SHIFT - Config.WEEK_SHIFT) * Config.VALUES_PER_DAY:]
-    # x_year = y(-365d)
-    x_shifted_year = values
-    # y = y(0d)
-    y = values[(Config.YEAR_SHIFT * Config.VALUES_PER_DAY):]
-
-    rcut_idx = min(
-        len(x),
-        len(y),
-        len(x_shifted_week),
-        len(x_shifted_year),
-    )
-
-    idx = df.index.copy()
-    idx = idx[
-        (Config.YEAR_SHIFT * Config.VALUES_PER_DAY): \
-            rcut_idx + (Config.YEAR_SHIFT * Config.VALUES_PER_DAY)
+    day = Config.VALUES_PER_DAY
+    year = Config.YEAR_SHIFT * day
+    # (column, lag) pairs of the columns of `values`, "value" is column 0
+    lags = [
+        (0, day),
+        (0, 0),
+        (0, Config.WEEK_SHIFT * day),
+        (0, year),
+        *((i + 1, year) for i in range(len(features)))
     ]
-
-    del df
-    
-    data = {
-        **{
-            "x": x[:rcut_idx],
-            "y": y[:rcut_idx],
-            "x_shifted_week": x_shifted_week[:rcut_idx],
-            "x_shifted_year": x_shifted_year[:rcut_idx],
-        },
-        **{k: v[:rcut_idx] for k, v in zip(features, features_values)}
-    }
-    df = DataFrame(data)
-    df.index = idx
-    
-    del x, y, x_shifted_week, x_shifted_year, idx, features_values, data
-
-    return df
+    values = df[["value", *features]].to_numpy(dtype=float32)
+    data, mask = lag_matrix(step_index(df.index, day), values, lags)
+
+    keep = mask.all(1)
+    index = df.index
+    if not keep.all():
+        data, index = data[keep], index[keep]
+    return DataFrame(data, index=index, columns=["x", "y", "x_shifted_week", "x_shifted_year", *features], copy=False)
 
 
 def generate_train_data(
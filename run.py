@@ -1,7 +1,10 @@
 import os
+import mmap
+import shutil
 import itertools
 from datetime import datetime
 
+import numpy as np
 import pandas as pd
 
 import torch
@@ -15,99 +18,103 @@ from sklearn.preprocessing import MinMaxScaler
 import project.utils as utils
 from config import Config
 from project.model import SequenceLearner
-
-
-def read_data(path) -> pd.Series:
+from project.datasets import MemmapDataset, SlidingWindowDataset
+from project.trainer import FastTrainer, EnsembleTrainer
+from project.parallel import run_parallel
+from project.results import ResultsStore, data_fingerprint, result_key
+from project.feature_store import FeatureStore, source_fingerprint
+from project.readers import history_start, iter_chunks, read_parquet
+from project.stats import RunningStats
+from project.streaming import StreamingFeatures
+
+
+def read_data(path, columns=None, dt_from=None, dt_till=None) -> pd.Series:
+    """Reads the columns (default all) of a parquet or csv file. The datetime range
+    dt_from <= Datetime < dt_till is only applied to parquet files, for which the
+    projection and the range are pushed down into the reader."""
     _, ext = os.path.splitext(path)
     if ext == ".parquet":
-        df = pd.read_parquet(path)
+        df = read_parquet(path, columns=columns, dt_from=dt_from, dt_till=dt_till)
     elif ext == '.csv':
-        df = pd.read_csv(path, low_memory=False)
+        df = pd.read_csv(path, usecols=columns, low_memory=False)
     else:
         raise ValueError("File extension is not supported")
     return df
 
 
-def grid_search(dataloader, device, in_features, out_features):
-    best_train_loss = float('inf')
-    best_model_path = None
-
-    # Generate all combinations of hyperparameters
-    for lnn_units, lr, num_epochs, lnn_modified in itertools.product(
-        Config.NUM_LNN_UNITS,
-        Config.INIT_LR,
-        Config.NUM_EPOCHS,
-        Config.USE_SWISH_ACTIVATION
-    ):
-        wiring = AutoNCP(lnn_units, out_features)
-
-        ltc_model = LTC(
-            in_features,
-            wiring,
-            batch_first=True,
-            use_swish_activation=lnn_modified
-        )
-        ltc_model.to(device)
-
-        learn = SequenceLearner(
-            ltc_model,
-            lr=lr,
-            features_num=in_features,
-            device=device
-        )
-
-        # Checkpoint callback to save the best model for this set of hyperparameters
-        checkpoint_callback = pl.callbacks.ModelCheckpoint(
-            monitor='train_loss',
-            dirpath=Config.CHECKPOINTS_PATH,
-            filename=f'model-lnn_units={lnn_units}-lr={lr}-num_epochs={num_epochs}-lnn_modified={lnn_modified}_{str(datetime.now()).replace(":","-")}',
-            save_top_k=1,
-            mode='min'
-        )
-
-        # Trainer
-        trainer = pl.Trainer(
-            max_epochs=num_epochs,
-            callbacks=[checkpoint_callback],
-            logger=pl.loggers.CSVLogger("log"),
-            gradient_clip_val=1,  # Clip gradient to stabilize training
-            # manual uncomment if using gpu for training
-            # gpus=1 if device == "cuda" else 0
-        )
-
-        # Train the model
-        trainer.fit(learn, dataloader)
-
-        # Check if this model is the best
-        if checkpoint_callback.best_model_score < best_train_loss:
-            best_train_loss = checkpoint_callback.best_model_score
-            best_model_path = checkpoint_callback.best_model_path
-
-    print(f'Best model saved at: {best_model_path} with validation loss: {best_train_loss}')
-
-    return best_model_path
-
-
-def train(device="cpu"):
-    
-    best_model_path = None
-
-    data_raw = read_data(Config.PATH)
-    data_raw = utils.prepare_data(data_raw, station=Config.STATION, features=Config.FEATURES_LIST)
+def make_train_data():
+    """Reads and preprocesses the training data as configured in Config.
+
+    The resulting float32 arrays are kept in the FeatureStore at
+    Config.FEATURE_STORE_PATH, together with the scaling statistics. As long
+    as the source file and the data related settings do not change, later
+    calls memory-map them from there instead of preprocessing again.
+
+    Returns:
+        Tuple[ndarray]: X and Y as float32 numpy arrays, memory-mapped from the
+            FeatureStore if Config.USE_FEATURE_STORE is set.
+    """
+    store = FeatureStore(Config.FEATURE_STORE_PATH)
+    key = store.key(
+        pipeline=utils.PIPELINE_VERSION,
+        source=source_fingerprint(Config.PATH),
+        station=Config.STATION,
+        features=Config.FEATURES_LIST,
+        scale_option=Config.SCALE_OPTION,
+        shifts=[Config.YEAR_SHIFT, Config.WEEK_SHIFT, Config.VALUES_PER_DAY],
+        dt_from=Config.FILTER_DT_FROM,
+        dt_till=Config.FILTER_DT_TILL,
+        computed_features=utils.computed_features(Config.FEATURES_LIST) if Config.COMPUTE_FEATURES else []
+    )
+    if Config.USE_FEATURE_STORE:
+        stored = store.load(key)
+        if stored is not None:
+            return stored[:2]
+
+    # features computed from the series instead of being read from the file
+    computed = utils.computed_features(Config.FEATURES_LIST) if Config.COMPUTE_FEATURES else []
+    read_features = [feature for feature in Config.FEATURES_LIST if feature not in computed]
+
+    # besides the training range, the history the lagged features of its first day are taken from
+    # (with a margin of a week for missing hours and one for the windows of the computed features)
+    history_days = Config.YEAR_SHIFT + Config.WEEK_SHIFT * (2 if computed else 1)
+    read_from = history_start(Config.FILTER_DT_FROM, history_days) if Config.FILTER_DT_FROM else None
+
+    if Config.STREAMING_INGESTION:
+        return stream_train_data(store, key, computed, read_from)
+
+    data_raw = read_data(
+        Config.PATH,
+        columns=["Datetime", Config.STATION, *read_features],
+        dt_from=read_from,
+        dt_till=Config.FILTER_DT_TILL
+    )
+    data_raw = utils.prepare_data(data_raw, station=Config.STATION, features=read_features)
+    data_raw = utils.add_features(data_raw, computed)
 
-    train_data = data_raw.copy()
-    
-    train_data = utils.make_features(train_data, features=Config.FEATURES_LIST)
+    train_data = utils.make_features(data_raw, features=Config.FEATURES_LIST)
     
     x_features, y_features = utils.generate_train_data(
         train_data, features=Config.FEATURES_LIST,
         dt_from=Config.FILTER_DT_FROM, dt_till=Config.FILTER_DT_TILL
     )
 
+    # statistics to undo the scaling, e.g. of the predictions
+    meta = {}
+
     if Config.SCALE_OPTION == 'global':
-        min_value, max_value = data_raw.value.min(), data_raw.value.max()
+        # over the rows prepare_data keeps of the whole file, not only of the ones read for training
+        if read_from is None and Config.FILTER_DT_TILL is None:
+            values = data_raw.value
+        else:
+            values = utils.prepare_data(
+                read_data(Config.PATH, columns=["Datetime", Config.STATION, *read_features]),
+                station=Config.STATION, features=read_features
+            ).value
+        min_value, max_value = values.min(), values.max()
         x_features = (x_features - min_value) / (max_value - min_value)
         y_features = (y_features - min_value) / (max_value - min_value)
+        meta = {"min_value": float(min_value), "max_value": float(max_value)}
     
     if Config.SCALE_OPTION == 'local':
         x_train_scaler = MinMaxScaler()
@@ -120,65 +127,561 @@ def train(device="cpu"):
         y_train_scaler, y_features = utils.normalize_data(
             y_train_scaler,
             y_features)
+        meta = {
+            "x_min": x_train_scaler.data_min_.tolist(), "x_max": x_train_scaler.data_max_.tolist(),
+            "y_min": y_train_scaler.data_min_.tolist(), "y_max": y_train_scaler.data_max_.tolist(),
+        }
+
+    x_features = x_features.astype(np.float32)
+    y_features = y_features.astype(np.float32)
+    if Config.USE_FEATURE_STORE:
+        store.save(key, x_features, y_features, meta)
+        # the same memory-mapped arrays as on a warm start
+        return store.load(key)[:2]
+
+    return x_features, y_features
+
+
+def stream_train_data(store, key, computed, read_from):
+    """Same as `make_train_data`, but reads and preprocesses Config.PATH in chunks of
+    Config.CHUNK_SIZE rows, such that the memory needed does not grow with the data.
+
+    The features of every chunk are appended to the FeatureStore entry of the key
+    while their statistics are updated online, the scaling is applied to the
+    written arrays afterwards, chunk by chunk. The source has to be sorted by
+    Datetime (within a chunk the rows may be unordered).
+
+    Returns:
+        Tuple[ndarray]: X and Y as float32 numpy arrays, memory-mapped from the FeatureStore.
+    """
+    builder = StreamingFeatures(Config.STATION, Config.FEATURES_LIST, computed_features=computed)
+    x_stats, y_stats = RunningStats(3 + len(Config.FEATURES_LIST)), RunningStats(1)
+
+    with store.writer(key) as writer:
+        for chunk in iter_chunks(
+            Config.PATH,
+            columns=["Datetime", Config.STATION, *builder.read_features],
+            dt_from=read_from,
+            dt_till=Config.FILTER_DT_TILL,
+            chunk_size=Config.CHUNK_SIZE
+        ):
+            train_data = builder.update(chunk)
+            if train_data is None:
+                continue
+            x_features, y_features = utils.generate_train_data(
+                train_data, features=Config.FEATURES_LIST,
+                dt_from=Config.FILTER_DT_FROM, dt_till=Config.FILTER_DT_TILL
+            )
+            writer.append(x_features, y_features)
+            x_stats.update(x_features)
+            y_stats.update(y_features)
+
+        # statistics to undo the scaling, e.g. of the predictions, and to standardize instead
+        meta = {
+            "x_mean": x_stats.mean.tolist(), "x_std": x_stats.std.tolist(),
+            "y_mean": y_stats.mean.tolist(), "y_std": y_stats.std.tolist(),
+            "repairs": builder.repairs,
+        }
+        # the arrays are mapped within scale_written only, such that they are
+        # unmapped before commit moves the files (which fails on Windows otherwise)
+        meta.update(scale_written(writer, x_stats, y_stats, builder.read_features))
+        writer.commit(meta)
+
+    print(f'Streamed {Config.PATH} into the feature store, repaired: {builder.repairs}')
+
+    return store.load(key)[:2]
+
+
+def scale_written(writer, x_stats, y_stats, read_features) -> dict:
+    """Scales the arrays written by the FeatureWriter in place, chunk by chunk, as configured
+    by Config.SCALE_OPTION.
+
+    Returns:
+        dict: statistics to undo the scaling.
+    """
+    meta = {}
+    x_features, y_features = writer.arrays()
 
-    out_features = y_features.shape[-1]
-    in_features = x_features.shape[-1]
+    if Config.SCALE_OPTION == 'global':
+        # over the rows prepare_data keeps of the whole file, not only of the ones read for training
+        value_stats = prepared_value_stats(read_features)
+        min_value, max_value = float(value_stats.min[0]), float(value_stats.max[0])
+        for start in range(0, len(x_features), Config.CHUNK_SIZE):
+            rows = slice(start, start + Config.CHUNK_SIZE)
+            x_features[rows] = (x_features[rows] - min_value) / (max_value - min_value)
+            y_features[rows] = (y_features[rows] - min_value) / (max_value - min_value)
+        meta.update({"min_value": min_value, "max_value": max_value})
 
-    ds = data_utils.TensorDataset(
-        torch.Tensor(x_features), torch.Tensor(y_features)
-    )
+    if Config.SCALE_OPTION == 'local':
+        # as MinMaxScaler, from the running minima and maxima of the columns
+        for array, stats, name in [(x_features, x_stats, "x"), (y_features, y_stats, "y")]:
+            data_min = stats.min.astype(np.float32)
+            data_range = stats.max.astype(np.float32) - data_min
+            scale = np.float32(1.0) / np.where(data_range == 0, np.float32(1.0), data_range)
+            offset = np.float32(0.0) - data_min * scale
+            for start in range(0, len(array), Config.CHUNK_SIZE):
+                rows = slice(start, start + Config.CHUNK_SIZE)
+                array[rows] = array[rows] * scale + offset
+            meta.update({f"{name}_min": stats.min.tolist(), f"{name}_max": stats.max.tolist()})
+
+    return meta
+
+
+def prepared_value_stats(read_features) -> RunningStats:
+    """Statistics of the station's values in the rows of the whole Config.PATH that
+    prepare_data keeps, read in chunks as by `stream_train_data`."""
+    validator = StreamingFeatures(Config.STATION, read_features)
+    stats = RunningStats()
+    for chunk in iter_chunks(
+        Config.PATH, columns=["Datetime", Config.STATION, *read_features], chunk_size=Config.CHUNK_SIZE
+    ):
+        df, _ = validator.prepare(chunk)
+        stats.update(df.value.to_numpy(dtype=np.float64))
+    return stats
+
+
+def is_mapped_file(array) -> bool:
+    """Whether the array is the whole content of a memory-mapped .npy file, e.g. one
+    loaded from the FeatureStore (and not a slice of it)."""
+    return isinstance(array, np.memmap) and isinstance(array.base, mmap.mmap)
+
+
+def make_dataloader(x_features, y_features, num_workers=Config.NUM_WORKERS):
+    if is_mapped_file(x_features) and is_mapped_file(y_features):
+        # the workers map the files themselves instead of receiving a copy of the arrays
+        window_size, stride = (Config.WINDOW_SIZE, Config.WINDOW_STRIDE) if Config.WINDOWED_TRAINING else (None, 1)
+        ds = MemmapDataset(x_features.filename, y_features.filename, window_size=window_size, stride=stride)
+        batch_size = Config.WINDOW_BATCH_SIZE if Config.WINDOWED_TRAINING else Config.BATCH_SIZE
+        shuffle = Config.WINDOWED_TRAINING
+    elif Config.WINDOWED_TRAINING:
+        # batches of overlapping (WINDOW_SIZE, F) windows, which are independent sequences
+        ds = SlidingWindowDataset(
+            x_features, y_features,
+            window_size=Config.WINDOW_SIZE, stride=Config.WINDOW_STRIDE
+        )
+        batch_size, shuffle = Config.WINDOW_BATCH_SIZE, True
+    else:
+        # as_tensor does not copy float32 arrays, e.g. the ones shared by parallel_grid_search
+        ds = data_utils.TensorDataset(
+            torch.as_tensor(x_features, dtype=torch.float32),
+            torch.as_tensor(y_features, dtype=torch.float32)
+        )
+        batch_size, shuffle = Config.BATCH_SIZE, False
 
-    dataloader = data_utils.DataLoader(
+    return data_utils.DataLoader(
         ds,
-        batch_size=Config.BATCH_SIZE,
-        num_workers=Config.NUM_WORKERS,
-        shuffle=False,
-        persistent_workers=True,
+        batch_size=batch_size,
+        num_workers=num_workers,
+        shuffle=shuffle,
+        persistent_workers=num_workers > 0,
     )
-    
-    if Config.GRID_SEARCH:
-        best_model_path = grid_search(
-            dataloader=dataloader,
-            device=device,
-            in_features=in_features,
-            out_features=out_features
-        )
 
-        return best_model_path
-
-    wiring = AutoNCP(Config.NUM_LNN_UNITS[0], out_features)  # 16 units, 1 motor neuron
 
-    ltc_model = LTC(
-        in_features,
-        wiring,
-        batch_first=True,
-        use_swish_activation=Config.USE_SWISH_ACTIVATION[0]
+def make_learner(model, lr, in_features, device) -> SequenceLearner:
+    """Wraps the model into a SequenceLearner for the training mode set in Config."""
+    return SequenceLearner(
+        model,
+        lr=lr,
+        features_num=in_features,
+        device=device,
+        burn_in=Config.BURN_IN_STEPS if Config.WINDOWED_TRAINING else 0,
+        stateful=Config.STATEFUL_TRAINING,
+        tbptt_steps=Config.TBPTT_STEPS,
+        # with TBPTT the optimization is manual, hence the learner has to clip the gradients
+        gradient_clip_val=1 if Config.TBPTT_STEPS else None
     )
-    ltc_model.to(device)
 
-    learn = SequenceLearner(ltc_model, lr=Config.INIT_LR[0], features_num=in_features, device=device)
 
+def fit(learn, dataloader, max_epochs, filename, dirpath=Config.CHECKPOINTS_PATH, save_last=False, ckpt_path=None):
+    """Trains the learner with the Lightning Trainer, or with the FastTrainer if Config.FAST_TRAINING is set.
+
+    With save_last the state after the last epoch is written to last.ckpt in dirpath,
+    passing it as ckpt_path to another call continues the training up to its max_epochs.
+
+    Returns:
+        Tuple: path and training loss of the best checkpoint.
+    """
+    if Config.FAST_TRAINING:
+        trainer = FastTrainer(
+            max_epochs=max_epochs,
+            gradient_clip_val=1,  # Clip gradient to stabilize training
+            log_every_n_steps=Config.LOG_EVERY_N_STEPS,
+            dirpath=dirpath,
+            filename=filename,
+            log_dir=os.path.join("log", "fast_trainer", filename),
+            save_last=save_last
+        )
+        trainer.fit(learn, dataloader, ckpt_path=ckpt_path)
+        return trainer.best_model_path, trainer.best_model_score
+
+    # Checkpoint callback to save the best model for this set of hyperparameters,
+    # by the mean loss of the epoch as the FastTrainer
     checkpoint_callback = pl.callbacks.ModelCheckpoint(
-        dirpath=Config.CHECKPOINTS_PATH,
-        filename=f'model-lnn_units={Config.NUM_LNN_UNITS[0]}-lr={Config.INIT_LR[0]}-num_epochs={Config.NUM_EPOCHS[0]}-lnn_modified={Config.USE_SWISH_ACTIVATION[0]}_{str(datetime.now()).replace(":","-")}',
+        monitor='train_loss_epoch',
+        dirpath=dirpath,
+        filename=filename,
         save_top_k=1,
-        monitor="train_loss",
-        mode="min"
+        save_last=save_last,
+        mode='min'
     )
 
+    # Trainer
     trainer = pl.Trainer(
+        max_epochs=max_epochs,
         callbacks=[checkpoint_callback],
-        logger=pl.loggers.CSVLogger("log"),
-        max_epochs=Config.NUM_EPOCHS[0],
-        gradient_clip_val=1,  # Clip gradient to stabilize training
+        # one version per model, parallel grid search workers would race for the next version number
+        logger=pl.loggers.CSVLogger("log", version=filename),
+        log_every_n_steps=Config.LOG_EVERY_N_STEPS,
+        gradient_clip_val=None if Config.TBPTT_STEPS else 1,  # Clip gradient to stabilize training
         # manual uncomment if using gpu for training
         # gpus=1 if device == "cuda" else 0
     )
 
     # Train the model
-    trainer.fit(learn, dataloader)
-    best_model_path = checkpoint_callback.best_model_path
-    best_train_loss = checkpoint_callback.best_model_score
+    trainer.fit(learn, dataloader, ckpt_path=ckpt_path)
+    return checkpoint_callback.best_model_path, checkpoint_callback.best_model_score
+
+
+def model_filename(lnn_units, lr, num_epochs, lnn_modified):
+    return f'model-lnn_units={lnn_units}-lr={lr}-num_epochs={num_epochs}-lnn_modified={lnn_modified}_{str(datetime.now()).replace(":","-")}'
+
+
+def make_model(lnn_units, lnn_modified, in_features, out_features, device) -> LTC:
+    ltc_model = LTC(
+        in_features,
+        AutoNCP(lnn_units, out_features, seed=Config.WIRING_SEED),
+        batch_first=True,
+        use_swish_activation=lnn_modified
+    )
+    return ltc_model.to(device)
+
+
+def combination_params(data_key, lnn_units, lr, num_epochs, lnn_modified) -> dict:
+    """Everything the training result of a grid search combination depends on,
+    its `result_key` identifies the combination in the ResultsStore.
+
+    Args:
+        data_key (str): `data_fingerprint` of the training arrays.
+    """
+    return {
+        "data": data_key,
+        "features": Config.FEATURES_LIST,
+        "wiring_seed": Config.WIRING_SEED,
+        "lnn_units": lnn_units,
+        "lr": lr,
+        "num_epochs": num_epochs,
+        "lnn_modified": lnn_modified,
+        "training": {
+            # the trainer, as the training loss it reports is what the results are ranked by
+            "metric": "train_loss_epoch",
+            **{
+                name: getattr(Config, name) for name in [
+                    "FAST_TRAINING", "ENSEMBLE_TRAINING",
+                    "BATCH_SIZE", "WINDOWED_TRAINING", "WINDOW_SIZE", "WINDOW_STRIDE",
+                    "WINDOW_BATCH_SIZE", "BURN_IN_STEPS", "STATEFUL_TRAINING", "TBPTT_STEPS"
+                ]
+            },
+        },
+    }
+
+
+def best_checkpoint(store, keys):
+    """Returns the path of the best checkpoint of the grid search combinations of the keys,
+    None if none of their checkpoints exists (anymore)."""
+    best = store.best(keys)
+    if best is None:
+        print('No checkpoint of the trained models found')
+        return None
+    best_model_path, best_train_loss = best
+    print(f'Best model saved at: {best_model_path} with validation loss: {best_train_loss}')
+    return best_model_path
+
+
+def ensemble_grid_search(dataloader, device, in_features, out_features, data_key):
+    """Same as `grid_search`, but all combinations of learning rate and number of epochs
+    of one (lnn_units, lnn_modified) pair are trained at once by an EnsembleTrainer.
+    """
+    store = ResultsStore(Config.RESULTS_DB)
+    keys = []
+
+    for lnn_units, lnn_modified in itertools.product(
+        Config.NUM_LNN_UNITS,
+        Config.USE_SWISH_ACTIVATION
+    ):
+        grid = []
+        for lr, num_epochs in itertools.product(Config.INIT_LR, Config.NUM_EPOCHS):
+            params = combination_params(data_key, lnn_units, lr, num_epochs, lnn_modified)
+            keys.append(result_key(**params))
+            if store.get(keys[-1]) is not None:
+                print(f'Skipping lnn_units={lnn_units} lr={lr} num_epochs={num_epochs} lnn_modified={lnn_modified}, already trained')
+                continue
+            grid.append((lr, num_epochs, params))
+        if not grid:
+            continue
+
+        learners = [
+            make_learner(make_model(lnn_units, lnn_modified, in_features, out_features, device), lr, in_features, device)
+            for lr, _, _ in grid
+        ]
+
+        trainer = EnsembleTrainer(
+            max_epochs=[num_epochs for _, num_epochs, _ in grid],
+            gradient_clip_val=1,  # Clip gradient to stabilize training
+            dirpath=Config.CHECKPOINTS_PATH,
+            filenames=[
+                model_filename(lnn_units, lr, num_epochs, lnn_modified) for lr, num_epochs, _ in grid
+            ]
+        )
+        trainer.fit(learners, dataloader)
+
+        for (_, _, params), model_path, train_loss in zip(grid, trainer.best_model_paths, trainer.best_model_scores):
+            store.put(result_key(**params), params, model_path, train_loss)
+
+    best_model_path = best_checkpoint(store, keys)
+    store.close()
+
+    return best_model_path
+
+
+def train_combination(
+        lnn_units, lr, num_epochs, lnn_modified, in_features, out_features, device, x_features, y_features):
+    """Trains the model of one grid search combination, runs in a worker of `parallel_grid_search`.
+
+    Returns:
+        Tuple: path and training loss of the best checkpoint.
+    """
+    # the worker process already runs in parallel to the others
+    dataloader = make_dataloader(x_features, y_features, num_workers=0)
+
+    ltc_model = make_model(lnn_units, lnn_modified, in_features, out_features, device)
+
+    learn = make_learner(ltc_model, lr, in_features, device)
+
+    model_path, train_loss = fit(
+        learn,
+        dataloader,
+        max_epochs=num_epochs,
+        filename=model_filename(lnn_units, lr, num_epochs, lnn_modified)
+    )
+    return model_path, float(train_loss)
+
+
+def parallel_grid_search(x_features, y_features, device, in_features, out_features, data_key):
+    """Same as `grid_search`, but the combinations are trained by Config.GRID_SEARCH_WORKERS
+    processes in parallel, each pinned to its share of the cores.
+    """
+    store = ResultsStore(Config.RESULTS_DB)
+    keys = []
+
+    tasks = []
+    for lnn_units, lr, num_epochs, lnn_modified in itertools.product(
+        Config.NUM_LNN_UNITS,
+        Config.INIT_LR,
+        Config.NUM_EPOCHS,
+        Config.USE_SWISH_ACTIVATION
+    ):
+        keys.append(result_key(**combination_params(data_key, lnn_units, lr, num_epochs, lnn_modified)))
+        if store.get(keys[-1]) is not None:
+            print(f'Skipping lnn_units={lnn_units} lr={lr} num_epochs={num_epochs} lnn_modified={lnn_modified}, already trained')
+            continue
+        tasks.append((lnn_units, lr, num_epochs, lnn_modified, in_features, out_features, device))
+    # longest runs first, such that no worker is left with a long run at the end
+    tasks.sort(key=lambda task: task[2], reverse=True)
+
+    # the training data is shared with the workers instead of being copied into every task
+    arrays = {
+        "x_features": np.asarray(x_features, dtype=np.float32),
+        "y_features": np.asarray(y_features, dtype=np.float32),
+    }
+    for task, (model_path, train_loss) in run_parallel(
+        train_combination, tasks, arrays, num_workers=Config.GRID_SEARCH_WORKERS
+    ):
+        print(f'Finished lnn_units={task[0]} lr={task[1]} num_epochs={task[2]} lnn_modified={task[3]} with training loss: {train_loss}')
+        params = combination_params(data_key, *task[:4])
+        store.put(result_key(**params), params, model_path, train_loss)
+
+    best_model_path = best_checkpoint(store, keys)
+    store.close()
+
+    return best_model_path
+
+
+def halving_search(dataloader, device, in_features, out_features, data_key):
+    """Successive halving over the epoch budgets in Config.NUM_EPOCHS.
+
+    All (lnn_units, lr, lnn_modified) combinations are trained for the smallest
+    budget. Only the best 1/Config.HALVING_ETA of them continue from their last
+    checkpoint to the next budget, and so on. Instead of training every budget
+    from scratch, a combination reaching the largest budget has been trained
+    for max(NUM_EPOCHS) epochs in total. For every budget reached, the best
+    checkpoint within that many epochs is saved under the same name as by
+    `grid_search`.
+    """
+    store = ResultsStore(Config.RESULTS_DB)
+    keys = []
+
+    survivors = list(itertools.product(
+        Config.NUM_LNN_UNITS,
+        Config.INIT_LR,
+        Config.USE_SWISH_ACTIVATION
+    ))
+    for num_epochs in sorted(set(Config.NUM_EPOCHS)):
+        results = []
+        for lnn_units, lr, lnn_modified in survivors:
+            params = combination_params(data_key, lnn_units, lr, num_epochs, lnn_modified)
+            keys.append(result_key(**params))
+            result = store.get(keys[-1])
+            if result is not None:
+                print(f'Budget of {num_epochs} epochs: {result[0]} with training loss: {result[1]} (already trained)')
+                results.append((result[1], (lnn_units, lr, lnn_modified)))
+                continue
+
+            ltc_model = make_model(lnn_units, lnn_modified, in_features, out_features, device)
+
+            learn = make_learner(ltc_model, lr, in_features, device)
+
+            # the training state of a combination is kept across the budgets,
+            # in a directory of its own for every training data and settings
+            run_name = f'lnn_units={lnn_units}-lr={lr}-lnn_modified={lnn_modified}'
+            run_dir = os.path.join(
+                Config.CHECKPOINTS_PATH, "halving",
+                result_key(**combination_params(data_key, lnn_units, lr, None, lnn_modified))
+            )
+            last_path = os.path.join(run_dir, "last.ckpt")
+            run_best_path, train_loss = fit(
+                learn,
+                dataloader,
+                max_epochs=num_epochs,
+                filename=run_name,
+                dirpath=run_dir,
+                save_last=True,
+                ckpt_path=last_path if os.path.exists(last_path) else None
+            )
+
+            model_path = os.path.join(
+                Config.CHECKPOINTS_PATH, model_filename(lnn_units, lr, num_epochs, lnn_modified) + ".ckpt"
+            )
+            shutil.copyfile(run_best_path, model_path)
+            train_loss = float(train_loss)
+            print(f'Budget of {num_epochs} epochs: {model_path} with training loss: {train_loss}')
+            store.put(keys[-1], params, model_path, train_loss)
+            results.append((train_loss, (lnn_units, lr, lnn_modified)))
+
+        results.sort(key=lambda result: result[0])
+        survivors = [combination for _, combination in results[:max(1, len(results) // Config.HALVING_ETA)]]
+
+    best_model_path = best_checkpoint(store, keys)
+    store.close()
+
+    return best_model_path
+
+
+def grid_search(dataloader, device, in_features, out_features, data_key):
+    """Trains all combinations of hyperparameters in Config, except the ones the
+    ResultsStore at Config.RESULTS_DB already holds for the same training data.
+
+    Args:
+        data_key (str): `data_fingerprint` of the training arrays.
+    """
+    if Config.SUCCESSIVE_HALVING:
+        return halving_search(dataloader, device, in_features, out_features, data_key)
+    if Config.ENSEMBLE_TRAINING:
+        return ensemble_grid_search(dataloader, device, in_features, out_features, data_key)
+
+    store = ResultsStore(Config.RESULTS_DB)
+    keys = []
+
+    # Generate all combinations of hyperparameters
+    for lnn_units, lr, num_epochs, lnn_modified in itertools.product(
+        Config.NUM_LNN_UNITS,
+        Config.INIT_LR,
+        Config.NUM_EPOCHS,
+        Config.USE_SWISH_ACTIVATION
+    ):
+        params = combination_params(data_key, lnn_units, lr, num_epochs, lnn_modified)
+        keys.append(result_key(**params))
+        # trained by an earlier, possibly interrupted, run
+        if store.get(keys[-1]) is not None:
+            print(f'Skipping lnn_units={lnn_units} lr={lr} num_epochs={num_epochs} lnn_modified={lnn_modified}, already trained')
+            continue
+
+        ltc_model = make_model(lnn_units, lnn_modified, in_features, out_features, device)
+
+        learn = make_learner(ltc_model, lr, in_features, device)
+
+        model_path, train_loss = fit(
+            learn,
+            dataloader,
+            max_epochs=num_epochs,
+            filename=model_filename(lnn_units, lr, num_epochs, lnn_modified)
+        )
+        store.put(keys[-1], params, model_path, train_loss)
+
+    best_model_path = best_checkpoint(store, keys)
+    store.close()
+
+    return best_model_path
+
+
+def train(device="cpu"):
+    
+    best_model_path = None
+
+    if Config.WINDOWED_TRAINING and Config.STATEFUL_TRAINING:
+        raise ValueError("Stateful training requires contiguous batches, it cannot be combined with windowed training")
+
+    searches = [
+        name for name, enabled in [
+            ("GRID_SEARCH_WORKERS > 1", Config.GRID_SEARCH_WORKERS > 1),
+            ("ENSEMBLE_TRAINING", Config.ENSEMBLE_TRAINING),
+            ("SUCCESSIVE_HALVING", Config.SUCCESSIVE_HALVING),
+        ] if enabled
+    ]
+    if Config.GRID_SEARCH and len(searches) > 1:
+        raise ValueError(f"{' and '.join(searches)} are alternative grid searches, they cannot be combined")
+
+    x_features, y_features = make_train_data()
+
+    out_features = y_features.shape[-1]
+    in_features = x_features.shape[-1]
+
+    if Config.GRID_SEARCH and Config.GRID_SEARCH_WORKERS > 1:
+        return parallel_grid_search(
+            x_features=x_features,
+            y_features=y_features,
+            device=device,
+            in_features=in_features,
+            out_features=out_features,
+            data_key=data_fingerprint(x_features, y_features)
+        )
+
+    dataloader = make_dataloader(x_features, y_features)
+
+    if Config.GRID_SEARCH:
+        best_model_path = grid_search(
+            dataloader=dataloader,
+            device=device,
+            in_features=in_features,
+            out_features=out_features,
+            data_key=data_fingerprint(x_features, y_features)
+        )
+
+        return best_model_path
+
+    ltc_model = make_model(
+        Config.NUM_LNN_UNITS[0], Config.USE_SWISH_ACTIVATION[0], in_features, out_features, device
+    )
+
+    learn = make_learner(ltc_model, Config.INIT_LR[0], in_features, device)
+
+    best_model_path, best_train_loss = fit(
+        learn,
+        dataloader,
+        max_epochs=Config.NUM_EPOCHS[0],
+        filename=model_filename(
+            Config.NUM_LNN_UNITS[0], Config.INIT_LR[0], Config.NUM_EPOCHS[0], Config.USE_SWISH_ACTIVATION[0]
+        )
+    )
 
     print(f'Best model saved at: {best_model_path} with validation loss: {best_train_loss}')
 